@@ -9,21 +9,23 @@ import os
 import sys
 from pathlib import Path
 
-# Local modules
+# Local modules (feature modules are imported lazily in DeveloperToolkit so
+# that --version does not pay for requests, cryptography, winreg, etc.)
 from src.utils.admin_check import verify_admin_privileges
 from src.utils.cleanup import CleanupManager
 from src.utils.ui import TUIManager
-from src.utils.feature_detection import FeatureDetection
-from src.modules.environment_setup import EnvironmentManager
-from src.modules.office_deployment import OfficeLTSCManager
-from src.modules.windows_config import WindowsConfigManager
-from src.modules.developer_keys import DeveloperKeyManager
 
 class DeveloperToolkit:
     """Main toolkit controller for Windows Developer Utilities"""
     
     def __init__(self):
         """Initialize the toolkit"""
+        from src.utils.feature_detection import FeatureDetection
+        from src.modules.environment_setup import EnvironmentManager
+        from src.modules.office_deployment import OfficeLTSCManager
+        from src.modules.windows_config import WindowsConfigManager
+        from src.modules.developer_keys import DeveloperKeyManager
+        
         self.logger = self._setup_logging()
         self.config = self._load_config()
         self.tui = TUIManager()
@@ -5,17 +5,57 @@ This module handles Windows developer key registration, validation, and secure s
 """
 import os
 import logging
+import functools
 import base64
 import json
 import re
 import hashlib
 import secrets
+import socket
 import winreg
+from datetime import datetime
 from typing import Dict, Any, Optional, Tuple, List
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
+
+@functools.lru_cache(maxsize=1)
+def _compute_machine_id() -> str:
+    """Compute the machine identifier once per process (WMI queries are slow)"""
+    try:
+        # Combine various system identifiers
+        import wmi
+        c = wmi.WMI()
+        
+        system_info = {}
+        
+        # Get BIOS serial
+        for bios in c.Win32_BIOS():
+            system_info['bios_serial'] = bios.SerialNumber
+            break
+        
+        # Get processor ID
+        for cpu in c.Win32_Processor():
+            system_info['processor_id'] = cpu.ProcessorId
+            break
+        
+        # Get disk serial
+        for disk in c.Win32_DiskDrive():
+            if disk.SerialNumber:
+                system_info['disk_serial'] = disk.SerialNumber
+                break
+        
+        # Create a combined hash
+        combined = "-".join(str(val) for val in system_info.values())
+        return hashlib.sha256(combined.encode()).hexdigest()[:16]
+        
+    except Exception as e:
+        logging.getLogger("dev_keys").error(f"Error getting machine ID: {str(e)}")
+        # Fallback to a less unique but still useful ID
+        return hashlib.md5(socket.gethostname().encode()).hexdigest()[:16]
+
+
 class DeveloperKeyManager:
     """
     Manages Windows developer keys for legitimate development environments.
@@ -27,31 +67,57 @@ class DeveloperKeyManager:
     REG_KEY_SALT_VALUE = "KeyStoreSalt"
     REG_KEY_STORE_VALUE = "SecureKeyStore"
     
-    # Key validation patterns
-    KEY_PATTERNS = {
-        "windows_dev": re.compile(r'^[A-Z0-9]{5}-[A-Z0-9]{5}-[A-Z0-9]{5}-[A-Z0-9]{5}-[A-Z0-9]{5}$'),
-        "enterprise": re.compile(r'^ENTDEV-[A-Z0-9]{16}-[A-Z0-9]{8}$'),
-        "visual_studio": re.compile(r'^VS-[A-Z0-9]{4}-[A-Z0-9]{4}-[A-Z0-9]{4}-[A-Z0-9]{4}-[A-Z0-9]{4}$')
+    # Joins the wrapped data key and the payload in the store value; Fernet
+    # tokens are URL-safe base64, so this byte never occurs inside one
+    _STORE_SEPARATOR = b"."
+    
+    # All key validation patterns in one regex; the matching group name is the key type
+    _KEY_TYPE_PATTERN = re.compile(
+        r'(?P<windows_dev>[A-Z0-9]{5}(?:-[A-Z0-9]{5}){4})'
+        r'|(?P<enterprise>ENTDEV-[A-Z0-9]{16}-[A-Z0-9]{8})'
+        r'|(?P<visual_studio>VS(?:-[A-Z0-9]{4}){5})',
+        re.ASCII
+    )
+    
+    # Developer key management menu
+    _MENU_OPTIONS = (
+        "Register new developer key",
+        "View registered keys",
+        "Validate developer key",
+        "Remove developer key",
+        "Back to main menu"
+    )
+    
+    # Key types offered at registration, with their display names in the same order
+    _KEY_TYPES = ("windows_dev", "enterprise", "visual_studio")
+    _KEY_TYPE_OPTIONS = ("Windows Developer Key", "Enterprise Developer Key", "Visual Studio Key")
+    
+    # User-friendly names for each key type
+    _TYPE_DISPLAY = {
+        "windows_dev": "Windows Developer Key",
+        "enterprise": "Enterprise Developer Key",
+        "visual_studio": "Visual Studio Key"
     }
     
+    # Cheap checks that reject most mismatches before the regex runs
+    _KEY_LENGTHS = {"windows_dev": 29, "enterprise": 32, "visual_studio": 27}
+    _KEY_PREFIXES = {"enterprise": "ENTDEV-", "visual_studio": "VS-"}
+    
     def __init__(self, config: Dict[str, Any]):
         """Initialize the developer key manager"""
         self.config = config
         self.logger = logging.getLogger("dev_keys")
         self.machine_id = self._get_machine_id()
+        self._kdf_cache: Dict[bytes, bytes] = {}
+        self._store_salt: Optional[bytes] = None
+        self._key_values: Optional[set] = None
+        self._store_data: Optional[bytes] = None
+        self._store_dek: Optional[bytes] = None
     
     def execute(self, ui):
         """Main execution flow for developer key management"""
-        options = [
-            "Register new developer key",
-            "View registered keys",
-            "Validate developer key",
-            "Remove developer key",
-            "Back to main menu"
-        ]
-        
         while True:
-            choice = ui.display_menu("Developer Key Management", options)
+            choice = ui.display_menu("Developer Key Management", self._MENU_OPTIONS)
             
             if choice == 4:  # Back to main menu
                 break
@@ -69,13 +135,15 @@ class DeveloperKeyManager:
         ui.display_info("Registering a new developer key...")
         
         # Get key information
-        key_type_options = ["Windows Developer Key", "Enterprise Developer Key", "Visual Studio Key"]
-        key_type_idx = ui.prompt_choice("Select key type:", key_type_options)
-        key_type = ["windows_dev", "enterprise", "visual_studio"][key_type_idx]
+        key_type_idx = ui.prompt_choice("Select key type:", self._KEY_TYPE_OPTIONS)
+        key_type = self._KEY_TYPES[key_type_idx]
+        
+        # Load the store once; existence checks and the final save reuse it
+        keys = self._get_stored_keys()
         
         # Get key value
         while True:
-            key_value = ui.prompt_input(f"Enter {key_type_options[key_type_idx]} value:")
+            key_value = ui.prompt_input(f"Enter {self._KEY_TYPE_OPTIONS[key_type_idx]} value:")
             
             # Validate key format
             if not self._validate_key_format(key_type, key_value):
@@ -106,7 +174,7 @@ class DeveloperKeyManager:
                 "machine_id": self.machine_id
             }
             
-            self._add_key_to_store(key_info)
+            self._add_key_to_store(key_info, keys)
             ui.display_success(f"Developer key registered successfully")
             
         except Exception as e:
@@ -150,17 +218,14 @@ class DeveloperKeyManager:
         
         try:
             # Check if the key format is valid for any known type
-            key_type = None
-            for ktype, pattern in self.KEY_PATTERNS.items():
-                if pattern.match(key_value):
-                    key_type = ktype
-                    break
+            key_type = self._match_key_type(key_value)
             
             if not key_type:
                 ui.display_error("Invalid key format. This does not match any supported key type.")
                 return
             
             # Check if the key is registered
+            keys = self._get_stored_keys()
             is_registered = self._key_exists(key_value)
             
             if is_registered:
@@ -183,7 +248,7 @@ class DeveloperKeyManager:
                         "machine_id": self.machine_id
                     }
                     
-                    self._add_key_to_store(key_info)
+                    self._add_key_to_store(key_info, keys)
                     ui.display_success(f"Developer key registered successfully")
             
         except Exception as e:
@@ -227,42 +292,80 @@ class DeveloperKeyManager:
     
     def _validate_key_format(self, key_type: str, key_value: str) -> bool:
         """Validate the format of a key"""
-        if key_type not in self.KEY_PATTERNS:
+        if len(key_value) != self._KEY_LENGTHS.get(key_type):
+            return False
+        if not key_value.startswith(self._KEY_PREFIXES.get(key_type, "")):
             return False
         
-        return bool(self.KEY_PATTERNS[key_type].match(key_value))
+        return self._match_key_type(key_value) == key_type
+    
+    def _match_key_type(self, key_value: str) -> Optional[str]:
+        """Identify the key type a value matches, if any"""
+        match = self._KEY_TYPE_PATTERN.fullmatch(key_value)
+        return match.lastgroup if match else None
     
     def _key_exists(self, key_value: str) -> bool:
         """Check if a key already exists in the store"""
-        keys = self._get_stored_keys()
-        return any(key["value"] == key_value for key in keys)
+        if self._key_values is None:
+            self._get_stored_keys()
+        return key_value in (self._key_values or ())
     
     def _get_stored_keys(self) -> List[Dict[str, Any]]:
         """Get all stored keys"""
         try:
             # Get registry values
-            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, self.REG_KEY_PATH, 0, 
-                              winreg.KEY_READ | winreg.KEY_WOW64_64KEY) as key:
-                encrypted_data = winreg.QueryValueEx(key, self.REG_KEY_STORE_VALUE)[0]
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, self.REG_KEY_PATH, 0,
+                                winreg.KEY_READ | winreg.KEY_WOW64_64KEY) as key:
+                stored_data = winreg.QueryValueEx(key, self.REG_KEY_STORE_VALUE)[0]
                 salt = winreg.QueryValueEx(key, self.REG_KEY_SALT_VALUE)[0]
             
-            # Decrypt the data
-            decrypted_data = self._decrypt_data(encrypted_data, salt)
+            # Remember the salt so saving does not have to read it again
+            self._store_salt = salt
+            self._store_dek = None
+            self._store_data = None
+            
+            # Stores written before data keys were introduced hold only the payload
+            wrapped_dek, _, encrypted_data = stored_data.rpartition(self._STORE_SEPARATOR)
+            
+            # Decrypt the data, either directly or through the wrapped data key
+            if not wrapped_dek:
+                decrypted_data = self._decrypt_data(encrypted_data, salt)
+            else:
+                self._store_dek = self._decrypt_data(wrapped_dek, salt)
+                decrypted_data = Fernet(self._store_dek).decrypt(encrypted_data)
             
             # Parse JSON
-            return json.loads(decrypted_data)
+            keys = json.loads(decrypted_data)
+            self._store_data = decrypted_data
+            self._key_values = {key["value"] for key in keys}
+            return keys
             
         except FileNotFoundError:
-            # Registry key doesn't exist yet
+            # Registry key doesn't exist yet, or the store was deleted since
+            # it was last read; the next save starts a fresh one
+            self._store_salt = None
+            self._store_dek = None
+            self._store_data = None
+            self._key_values = set()
             return []
         except Exception as e:
+            # Forget the store entirely; _key_values stays None so nothing is
+            # saved over data that could not be read
+            self._store_salt = None
+            self._store_dek = None
+            self._store_data = None
+            self._key_values = None
             self.logger.error(f"Error retrieving stored keys: {str(e)}")
             return []
     
-    def _add_key_to_store(self, key_info: Dict[str, Any]):
+    def _add_key_to_store(self, key_info: Dict[str, Any], existing: Optional[List[Dict[str, Any]]] = None):
         """Add a key to the secure store"""
-        # Get existing keys
-        keys = self._get_stored_keys()
+        # Get existing keys unless the caller already loaded them
+        keys = list(existing) if existing is not None else self._get_stored_keys()
+        
+        # Refuse to replace a store that exists but could not be read
+        if self._key_values is None:
+            raise RuntimeError("The key store could not be read, so it was not overwritten")
         
         # Add new key
         keys.append(key_info)
@@ -273,53 +376,69 @@ class DeveloperKeyManager:
     def _save_keys(self, keys: List[Dict[str, Any]]):
         """Save keys to the secure store"""
         try:
-            # Generate salt if not existing
-            try:
-                with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, self.REG_KEY_PATH, 0, 
-                                  winreg.KEY_READ | winreg.KEY_WOW64_64KEY) as key:
-                    salt = winreg.QueryValueEx(key, self.REG_KEY_SALT_VALUE)[0]
-            except FileNotFoundError:
-                # Create new salt
+            # Serialize data and skip the write if the store already holds it
+            json_data = json.dumps(keys, separators=(",", ":"), ensure_ascii=False).encode()
+            if json_data == self._store_data:
+                return
+            
+            # Reuse the salt read by _get_stored_keys, or create one for a new store
+            salt = self._store_salt
+            salt_changed = salt is None
+            if salt_changed:
                 salt = secrets.token_bytes(16)
             
-            # Serialize and encrypt data
-            json_data = json.dumps(keys, indent=2)
-            encrypted_data = self._encrypt_data(json_data, salt)
+            # The payload is encrypted with a random data key, which is itself
+            # encrypted with the password-derived key and stored next to it
+            dek = None if salt_changed else self._store_dek
+            if dek is None:
+                dek = Fernet.generate_key()
+            
+            # The wrapped data key and the payload share one value, so a failed
+            # write never leaves one without the other
+            stored_data = self._STORE_SEPARATOR.join((self._encrypt_data(dek, salt),
+                                                      Fernet(dek).encrypt(json_data)))
             
-            # Save to registry
-            with winreg.CreateKey(winreg.HKEY_LOCAL_MACHINE, self.REG_KEY_PATH) as key:
-                winreg.SetValueEx(key, self.REG_KEY_STORE_VALUE, 0, winreg.REG_BINARY, encrypted_data)
-                winreg.SetValueEx(key, self.REG_KEY_SALT_VALUE, 0, winreg.REG_BINARY, salt)
+            # Save to registry through a single handle; a salt without a store
+            # value still reads as an empty store, so the salt goes first
+            with winreg.CreateKeyEx(winreg.HKEY_LOCAL_MACHINE, self.REG_KEY_PATH, 0,
+                                    winreg.KEY_SET_VALUE | winreg.KEY_WOW64_64KEY) as key:
+                if salt_changed:
+                    winreg.SetValueEx(key, self.REG_KEY_SALT_VALUE, 0, winreg.REG_BINARY, salt)
+                winreg.SetValueEx(key, self.REG_KEY_STORE_VALUE, 0, winreg.REG_BINARY, stored_data)
+            
+            self._store_salt = salt
+            self._store_dek = dek
+            self._store_data = json_data
+            self._key_values = {key["value"] for key in keys}
                 
         except Exception as e:
             self.logger.error(f"Error saving keys: {str(e)}")
             raise
     
-    def _encrypt_data(self, data: str, salt: bytes) -> bytes:
+    def _derive_fernet_key(self, salt: bytes) -> bytes:
+        """Derive the Fernet key for a salt, running PBKDF2 only once per salt"""
+        key = self._kdf_cache.get(salt)
+        if key is None:
+            password = self._get_encryption_password().encode()
+            kdf = PBKDF2HMAC(
+                algorithm=hashes.SHA256(),
+                length=32,
+                salt=salt,
+                iterations=100000,
+            )
+            key = base64.urlsafe_b64encode(kdf.derive(password))
+            self._kdf_cache[salt] = key
+        return key
+    
+    def _encrypt_data(self, data: bytes, salt: bytes) -> bytes:
         """Encrypt data using Fernet symmetric encryption"""
-        password = self._get_encryption_password().encode()
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password))
-        f = Fernet(key)
-        return f.encrypt(data.encode())
+        f = Fernet(self._derive_fernet_key(salt))
+        return f.encrypt(data)
     
-    def _decrypt_data(self, encrypted_data: bytes, salt: bytes) -> str:
+    def _decrypt_data(self, encrypted_data: bytes, salt: bytes) -> bytes:
         """Decrypt data using Fernet symmetric encryption"""
-        password = self._get_encryption_password().encode()
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password))
-        f = Fernet(key)
-        return f.decrypt(encrypted_data).decode()
+        f = Fernet(self._derive_fernet_key(salt))
+        return f.decrypt(encrypted_data)
     
     def _get_encryption_password(self) -> str:
         """Get encryption password based on unique machine characteristics"""
@@ -329,54 +448,20 @@ class DeveloperKeyManager:
     
     def _get_machine_id(self) -> str:
         """Get a unique identifier for this machine"""
-        try:
-            # Combine various system identifiers
-            import wmi
-            c = wmi.WMI()
-            
-            system_info = {}
-            
-            # Get BIOS serial
-            for bios in c.Win32_BIOS():
-                system_info['bios_serial'] = bios.SerialNumber
-            
-            # Get processor ID
-            for cpu in c.Win32_Processor():
-                system_info['processor_id'] = cpu.ProcessorId
-            
-            # Get disk serial
-            for disk in c.Win32_DiskDrive():
-                if disk.SerialNumber:
-                    system_info['disk_serial'] = disk.SerialNumber
-                    break
-            
-            # Create a combined hash
-            combined = "-".join(str(val) for val in system_info.values())
-            return hashlib.sha256(combined.encode()).hexdigest()[:16]
-            
-        except Exception as e:
-            self.logger.error(f"Error getting machine ID: {str(e)}")
-            # Fallback to a less unique but still useful ID
-            import socket
-            return hashlib.md5(socket.gethostname().encode()).hexdigest()[:16]
+        return _compute_machine_id()
     
     def _get_current_date(self) -> str:
         """Get current date in a standardized format"""
-        from datetime import datetime
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     def _mask_key_value(self, key_value: str) -> str:
         """Mask key value for display (show only first and last 4 chars)"""
-        if len(key_value) <= 8:
-            return "*" * len(key_value)
+        n = len(key_value)
+        if n <= 8:
+            return "*" * n
         
-        return key_value[:4] + "*" * (len(key_value) - 8) + key_value[-4:]
+        return f"{key_value[:4]}{'*' * (n - 8)}{key_value[-4:]}"
     
     def _get_key_type_display(self, key_type: str) -> str:
         """Get user-friendly display name for key type"""
-        type_display = {
-            "windows_dev": "Windows Developer Key",
-            "enterprise": "Enterprise Developer Key",
-            "visual_studio": "Visual Studio Key"
-        }
-        return type_display.get(key_type, key_type)
\ No newline at end of file
+        return self._TYPE_DISPLAY.get(key_type, key_type)
\ No newline at end of file
@@ -6,7 +6,6 @@ This module handles development environment setup for various technologies.
 import os
 import sys
 import logging
-import time
 import shutil
 from typing import List, Dict, Any, Optional
 
@@ -16,23 +15,43 @@ class EnvironmentManager:
     This includes installing essential development tools and configuring environments.
     """
     
+    # Environment setup menu
+    _MENU_OPTIONS = (
+        "Install Development Tools",
+        "Configure Python Environment",
+        "Configure Node.js Environment",
+        "Configure .NET Environment",
+        "Back to main menu"
+    )
+    
+    # Install command for each development tool
+    _WINGET_CMDS = {
+        "git": ("winget", "install", "--id", "Git.Git", "-e", "--source", "winget"),
+        "vscode": ("winget", "install", "--id", "Microsoft.VisualStudioCode", "-e", "--source", "winget"),
+        "visualstudio": ("winget", "install", "--id", "Microsoft.VisualStudio.2022.Community", "-e", "--source", "winget"),
+        "docker": ("winget", "install", "--id", "Docker.DockerDesktop", "-e", "--source", "winget"),
+        "wsl": ("wsl", "--install"),
+        "python": ("winget", "install", "--id", "Python.Python.3.10", "-e", "--source", "winget"),
+        "nodejs": ("winget", "install", "--id", "OpenJS.NodeJS", "-e", "--source", "winget"),
+        "dotnet": ("winget", "install", "--id", "Microsoft.DotNet.SDK.6", "-e", "--source", "winget")
+    }
+    
     def __init__(self, config: Dict[str, Any]):
         """Initialize the environment manager"""
         self.config = config
         self.logger = logging.getLogger("environment")
+        self._tool_paths: Dict[str, Optional[str]] = {}
+        
+    def _find_tool(self, name: str) -> Optional[str]:
+        """Locate an executable on PATH, remembering the result for this session"""
+        if name not in self._tool_paths:
+            self._tool_paths[name] = shutil.which(name)
+        return self._tool_paths[name]
         
     def execute(self, ui):
         """Main execution flow for environment setup"""
-        options = [
-            "Install Development Tools",
-            "Configure Python Environment",
-            "Configure Node.js Environment",
-            "Configure .NET Environment",
-            "Back to main menu"
-        ]
-        
         while True:
-            choice = ui.display_menu("Development Environment Setup", options)
+            choice = ui.display_menu("Development Environment Setup", self._MENU_OPTIONS)
             
             if choice == 4:  # Back to main menu
                 break
@@ -81,48 +100,39 @@ class EnvironmentManager:
             ui.display_info("Operation cancelled")
             return
             
-        # Install selected tools
+        # Install selected tools one at a time; Windows Installer allows only
+        # one install in progress at once
         for tool, name in zip(selected_tools, selected_names):
-            ui.display_info(f"Installing {name}...")
-            
-            try:
-                self._install_tool(ui, tool)
-            except Exception as e:
-                ui.display_error(f"Error installing {name}: {str(e)}")
-                self.logger.error(f"Tool installation error: {str(e)}")
+            self._install_selected_tool(ui, tool, name)
         
         ui.display_success("Development tools installation completed")
     
+    def _install_selected_tool(self, ui, tool_id, name):
+        """Install one selected tool, reporting failures instead of raising"""
+        ui.display_info(f"Installing {name}...")
+        
+        try:
+            self._install_tool(ui, tool_id)
+        except Exception as e:
+            ui.display_error(f"Error installing {name}: {str(e)}")
+            self.logger.error(f"Tool installation error: {str(e)}")
+    
     def _install_tool(self, ui, tool_id):
         """Install a specific development tool"""
         # In a real implementation, this would use winget, chocolatey, or direct download
         # For this example, we'll just show the commands that would be used
         
-        if tool_id == "git":
-            ui.display_info("Would run: winget install --id Git.Git -e --source winget")
-            # subprocess.run(["winget", "install", "--id", "Git.Git", "-e", "--source", "winget"])
-        elif tool_id == "vscode":
-            ui.display_info("Would run: winget install --id Microsoft.VisualStudioCode -e --source winget")
-        elif tool_id == "visualstudio":
-            ui.display_info("Would run: winget install --id Microsoft.VisualStudio.2022.Community -e --source winget")
-        elif tool_id == "docker":
-            ui.display_info("Would run: winget install --id Docker.DockerDesktop -e --source winget")
-        elif tool_id == "wsl":
-            ui.display_info("Would run: wsl --install")
-        elif tool_id == "python":
-            ui.display_info("Would run: winget install --id Python.Python.3.10 -e --source winget")
-        elif tool_id == "nodejs":
-            ui.display_info("Would run: winget install --id OpenJS.NodeJS -e --source winget")
-        elif tool_id == "dotnet":
-            ui.display_info("Would run: winget install --id Microsoft.DotNet.SDK.6 -e --source winget")
+        cmd = self._WINGET_CMDS.get(tool_id)
+        if cmd:
+            ui.display_info("Would run: " + " ".join(cmd))
+            # subprocess.run(cmd)
         
-        # Simulate installation
-        import time
-        for i in range(5):
-            ui.update_progress(i * 20)
-            time.sleep(0.2)
+        # Nothing is actually installed yet, so report completion right away
         ui.update_progress(100)
         
+        # PATH may have changed, so look tools up again next time
+        self._tool_paths.clear()
+        
         ui.display_success(f"Successfully installed {tool_id}")
     
     def _configure_python(self, ui):
@@ -130,8 +140,7 @@ class EnvironmentManager:
         ui.display_info("Configuring Python environment...")
         
         # Check if Python is installed
-        import shutil
-        python_path = shutil.which("python") or shutil.which("python3")
+        python_path = self._find_tool("python") or self._find_tool("python3")
         
         if not python_path:
             ui.display_error("Python is not installed or not in PATH")
@@ -176,9 +185,8 @@ class EnvironmentManager:
         ui.display_info("Configuring Node.js environment...")
         
         # Check if Node.js is installed
-        import shutil
-        node_path = shutil.which("node")
-        npm_path = shutil.which("npm")
+        node_path = self._find_tool("node")
+        npm_path = self._find_tool("npm")
         
         if not node_path or not npm_path:
             ui.display_error("Node.js is not installed or not in PATH")
@@ -221,8 +229,7 @@ class EnvironmentManager:
         ui.display_info("Configuring .NET environment...")
         
         # Check if .NET is installed
-        import shutil
-        dotnet_path = shutil.which("dotnet")
+        dotnet_path = self._find_tool("dotnet")
         
         if not dotnet_path:
             ui.display_error(".NET SDK is not installed or not in PATH")
@@ -5,13 +5,78 @@ This module handles legitimate Office LTSC deployment scenarios for
 enterprise environments using volume licensing.
 """
 import os
+import shutil
+import functools
+import hashlib
 import subprocess
 import tempfile
 import logging
+import threading
 import requests
 import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
 from pathlib import Path
+from types import MappingProxyType
 from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Shared HTTP session so repeated ODT requests reuse pooled connections
+_SESSION = requests.Session()
+_SESSION.headers["User-Agent"] = "windows-dev-toolkit/1.0.0"
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.5)
+))
+
+# Map user-friendly names to product IDs (read-only; shared by every manager)
+_PRODUCT_MAP = MappingProxyType({
+    "Office LTSC Professional Plus 2021 - Volume License": "ProPlus2021Volume",
+    "Office LTSC Standard 2021 - Volume License": "Standard2021Volume",
+    "Visio LTSC Professional 2021 - Volume License": "VisioPro2021Volume",
+    "Project LTSC Professional 2021 - Volume License": "ProjectPro2021Volume"
+})
+_PRODUCT_KEYS = tuple(_PRODUCT_MAP)
+
+# The ODT tools report through their own UI and logs, so never give them a console
+_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+class _DownloadProgress:
+    """Thread-safe byte counter that reports whole-percent download progress"""
+    
+    def __init__(self, total_size: int, on_progress):
+        self._total_size = total_size
+        self._on_progress = on_progress
+        self._last_percent = -1
+        self._lock = threading.Lock()
+        self.received = 0
+    
+    def add(self, count: int):
+        with self._lock:
+            self.received += count
+            # Only redraw when the whole percentage changes
+            if self._total_size:
+                percent = self.received * 100 // self._total_size
+                if percent != self._last_percent:
+                    self._on_progress(percent)
+                    self._last_percent = percent
+
+
+class _ProgressWriter:
+    """File wrapper that feeds the number of bytes written into a _DownloadProgress"""
+    
+    def __init__(self, file, progress: _DownloadProgress):
+        self._file = file
+        self._progress = progress
+    
+    def write(self, data) -> int:
+        count = self._file.write(data)
+        self._progress.add(len(data))
+        return count
+
 
 class OfficeLTSCManager:
     """
@@ -19,11 +84,49 @@ class OfficeLTSCManager:
     for legitimate enterprise deployment scenarios.
     """
     
+    # Official Microsoft download location for the ODT
+    ODT_URL = "https://download.microsoft.com/download/2/7/A/27AF1BE6-DD20-4CB4-B154-EBAB8A7D4A7E/officedeploymenttool_16327-20214.exe"
+    
+    # Read size for streamed downloads
+    DOWNLOAD_CHUNK_SIZE = 1 << 20
+    
+    # Split larger downloads into this many concurrent range requests
+    RANGE_DOWNLOAD_PARTS = 4
+    RANGE_DOWNLOAD_MIN_SIZE = 2 << 20
+    
+    # Persistent cache for downloaded installers (survives between runs)
+    DOWNLOAD_CACHE_DIR = Path.home() / ".windows_dev_toolkit" / "downloads"
+    
+    # ODT configuration that removes every Office installation
+    REMOVE_CONFIG_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<Configuration>
+  <Remove All="TRUE" />
+  <Display Level="Full" AcceptEULA="TRUE" />
+</Configuration>
+"""
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.logger = logging.getLogger("office_ltsc")
         self.temp_dir = None
         self.odt_path = None
+        self.cache_dir = Path(config.get("office", {}).get("cache_dir", self.DOWNLOAD_CACHE_DIR))
+        self._register_exit_handler()
+    
+    @property
+    def _setup_path(self) -> Optional[str]:
+        """Path of setup.exe in the extracted ODT, if one has been extracted"""
+        return os.path.join(self.odt_path, "setup.exe") if self.odt_path else None
+    
+    @property
+    def _config_path(self) -> Optional[str]:
+        """Path of the deployment configuration next to setup.exe"""
+        return os.path.join(self.odt_path, "configuration.xml") if self.odt_path else None
+    
+    def _register_exit_handler(self):
+        """Register exit handler so the ODT temp directory never outlives the process"""
+        import atexit
+        atexit.register(self.cleanup)
     
     def execute(self, ui):
         """Main execution flow for Office LTSC management"""
@@ -51,28 +154,31 @@ class OfficeLTSCManager:
     
     def _download_odt(self, ui):
         """Download the official Office Deployment Tool"""
+        # Reuse the tool extracted earlier this session (e.g. when retrying a failed deployment)
+        if self._setup_path and os.path.isfile(self._setup_path):
+            ui.display_success("Office Deployment Tool is already available")
+            self.logger.info(f"Reusing extracted ODT at {self.odt_path}")
+            return
+        
         ui.display_info("Downloading Office Deployment Tool...")
         
         try:
+            # Drop any previous download before starting a new one
+            self.cleanup()
+            
             # Create temporary directory
             self.temp_dir = tempfile.mkdtemp()
             self.logger.info(f"Created temporary directory: {self.temp_dir}")
             
             # Download ODT from official Microsoft source
-            odt_url = "https://download.microsoft.com/download/2/7/A/27AF1BE6-DD20-4CB4-B154-EBAB8A7D4A7E/officedeploymenttool_16327-20214.exe"
             odt_installer = os.path.join(self.temp_dir, "odt_installer.exe")
             
-            ui.display_progress("Downloading Office Deployment Tool...")
-            response = requests.get(odt_url, stream=True)
-            total_size = int(response.headers.get('content-length', 0))
-            
-            with open(odt_installer, 'wb') as f:
-                downloaded = 0
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        ui.update_progress(downloaded / total_size * 100)
+            if self._restore_cached_installer(odt_installer):
+                ui.display_info("Using cached Office Deployment Tool installer")
+            else:
+                ui.display_progress("Downloading Office Deployment Tool...")
+                validator = self._fetch_installer(ui, odt_installer)
+                self._store_cached_installer(odt_installer, validator)
             
             # Extract ODT
             ui.display_info("Extracting Office Deployment Tool...")
@@ -82,7 +188,11 @@ class OfficeLTSCManager:
             # Run the ODT installer to extract
             result = subprocess.run(
                 [odt_installer, "/extract:", self.odt_path, "/quiet"],
-                check=True
+                cwd=self.temp_dir,
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                creationflags=_NO_WINDOW
             )
             
             if result.returncode == 0:
@@ -95,6 +205,140 @@ class OfficeLTSCManager:
             ui.display_error(f"Error downloading ODT: {str(e)}")
             self.logger.error(f"ODT download error: {str(e)}")
     
+    def _fetch_installer(self, ui, destination: str) -> Optional[str]:
+        """Download the ODT installer, in parallel byte ranges when the server allows it"""
+        total_size = 0
+        validator = None
+        try:
+            with _SESSION.head(self.ODT_URL, allow_redirects=True, timeout=(5, 10)) as response:
+                response.raise_for_status()
+                total_size = int(response.headers.get("Content-Length", 0))
+                accepts_ranges = response.headers.get("Accept-Ranges") == "bytes"
+                validator = self._get_cache_validator(response)
+        except requests.RequestException as e:
+            self.logger.warning(f"Could not probe ODT download: {str(e)}")
+            accepts_ranges = False
+        
+        # Ranges are only stitched together when every one is pinned to the same
+        # version of the file through If-Range
+        if accepts_ranges and validator and total_size >= self.RANGE_DOWNLOAD_MIN_SIZE:
+            try:
+                self._download_ranges(ui, destination, total_size, validator)
+                return validator
+            except (requests.RequestException, OSError) as e:
+                self.logger.warning(f"Ranged ODT download failed, retrying as one stream: {str(e)}")
+        
+        return self._download_stream(ui, destination)
+    
+    def _download_stream(self, ui, destination: str) -> Optional[str]:
+        """Download the ODT installer as a single stream"""
+        with _SESSION.get(
+            self.ODT_URL,
+            stream=True,
+            timeout=(5, 30),
+            headers={"Accept-Encoding": "identity"}  # Installer is already compressed
+        ) as response:
+            response.raise_for_status()
+            total_size = int(response.headers.get('content-length', 0))
+            progress = _DownloadProgress(total_size, ui.update_progress)
+            
+            # Copy straight from the connection's reader into the file
+            response.raw.decode_content = True
+            with open(destination, 'wb') as f:
+                shutil.copyfileobj(response.raw, _ProgressWriter(f, progress), self.DOWNLOAD_CHUNK_SIZE)
+            
+            return self._get_cache_validator(response)
+    
+    def _download_ranges(self, ui, destination: str, total_size: int, validator: str):
+        """Download the ODT installer as concurrent byte ranges into a preallocated file"""
+        with open(destination, 'wb') as f:
+            f.truncate(total_size)
+        
+        part_size = -(-total_size // self.RANGE_DOWNLOAD_PARTS)
+        ranges = [
+            (start, min(start + part_size, total_size) - 1)
+            for start in range(0, total_size, part_size)
+        ]
+        progress = _DownloadProgress(total_size, ui.update_progress)
+        
+        with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+            futures = [
+                pool.submit(self._download_range, destination, start, end, validator, progress)
+                for start, end in ranges
+            ]
+            for future in futures:
+                future.result()
+    
+    def _download_range(self, destination: str, start: int, end: int, validator: str,
+                        progress: _DownloadProgress):
+        """Download one byte range of the ODT installer into its slice of the file"""
+        with _SESSION.get(
+            self.ODT_URL,
+            stream=True,
+            timeout=(5, 30),
+            headers={"Range": f"bytes={start}-{end}", "If-Range": validator, "Accept-Encoding": "identity"}
+        ) as response:
+            response.raise_for_status()
+            # A 200 means the installer changed since the probe (or ranges were
+            # ignored), so the caller starts over with a single stream
+            if response.status_code != 206:
+                raise requests.HTTPError(f"Range request returned status {response.status_code}")
+            
+            with open(destination, 'r+b') as f:
+                f.seek(start)
+                shutil.copyfileobj(response.raw, _ProgressWriter(f, progress), self.DOWNLOAD_CHUNK_SIZE)
+    
+    def _get_installer_cache_paths(self):
+        """Get the cached installer path and its validator sidecar for the ODT URL"""
+        key = hashlib.sha256(self.ODT_URL.encode()).hexdigest()
+        return self.cache_dir / f"{key}.exe", self.cache_dir / f"{key}.validator"
+    
+    def _get_cache_validator(self, response) -> Optional[str]:
+        """Get the ETag or Last-Modified header used to detect a republished installer"""
+        return response.headers.get('ETag') or response.headers.get('Last-Modified')
+    
+    def _restore_cached_installer(self, destination: str) -> bool:
+        """Copy the cached ODT installer to destination if it is still current"""
+        cached_path, validator_path = self._get_installer_cache_paths()
+        if not cached_path.is_file():
+            return False
+        
+        try:
+            stored = validator_path.read_text().strip()
+        except OSError:
+            stored = None
+        
+        try:
+            with _SESSION.head(self.ODT_URL, allow_redirects=True, timeout=(5, 10)) as response:
+                current = self._get_cache_validator(response)
+        except requests.RequestException as e:
+            # Offline or unreachable - the cached copy is the best we have
+            self.logger.warning(f"Could not revalidate cached ODT installer: {str(e)}")
+            current = None
+        
+        if current is not None and current != stored:
+            self.logger.info("Cached ODT installer is outdated, downloading again")
+            return False
+        
+        shutil.copyfile(cached_path, destination)
+        self.logger.info(f"Restored ODT installer from cache: {cached_path}")
+        return True
+    
+    def _store_cached_installer(self, installer: str, validator: Optional[str]):
+        """Save a freshly downloaded ODT installer to the persistent cache"""
+        cached_path, validator_path = self._get_installer_cache_paths()
+        
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(installer, cached_path)
+            if validator:
+                validator_path.write_text(validator)
+            elif validator_path.exists():
+                validator_path.unlink()
+            self.logger.info(f"Cached ODT installer at {cached_path}")
+        except OSError as e:
+            self.logger.warning(f"Could not cache ODT installer: {str(e)}")
+    
     def _configure_deployment(self, ui):
         """Configure Office LTSC deployment XML"""
         if not self._check_odt(ui):
@@ -108,22 +352,15 @@ class OfficeLTSCManager:
         config["language"] = ui.prompt_input("Enter language (e.g., en-us):", default="en-us")
         
         # Product selection
-        products = [
-            "Office LTSC Professional Plus 2021 - Volume License",
-            "Office LTSC Standard 2021 - Volume License",
-            "Visio LTSC Professional 2021 - Volume License",
-            "Project LTSC Professional 2021 - Volume License"
-        ]
-        
-        config["products"] = ui.prompt_multichoice("Select products to install:", products)
+        config["products"] = ui.prompt_multichoice("Select products to install:", _PRODUCT_KEYS)
         
         # Generate configuration XML
         xml_content = self._generate_config_xml(config)
-        config_path = os.path.join(self.odt_path, "configuration.xml")
+        config_path = self._config_path
         
         try:
-            with open(config_path, "w") as f:
-                f.write(xml_content)
+            with open(config_path, "wb") as f:
+                f.write(xml_content.encode("utf-8"))
             
             ui.display_success("Configuration file created successfully")
             ui.display_info(f"Configuration saved to: {config_path}")
@@ -134,43 +371,35 @@ class OfficeLTSCManager:
     
     def _generate_config_xml(self, config):
         """Generate Office LTSC configuration XML"""
-        # Map user-friendly names to product IDs
-        product_map = {
-            "Office LTSC Professional Plus 2021 - Volume License": "ProPlus2021Volume",
-            "Office LTSC Standard 2021 - Volume License": "Standard2021Volume",
-            "Visio LTSC Professional 2021 - Volume License": "VisioPro2021Volume",
-            "Project LTSC Professional 2021 - Volume License": "ProjectPro2021Volume"
-        }
-        
-        # Create XML structure
-        root = ET.Element("Configuration")
+        return self._config_xml_for(config["architecture"], config["language"], tuple(config["products"]))
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=32)
+    def _config_xml_for(architecture: int, language: str, products: tuple) -> str:
+        """Build the configuration XML, reusing the result for repeated selections"""
+        # The schema is small and fixed, so write the XML directly
+        edition = "32" if architecture == 0 else "64"
+        language = quoteattr(language)
         
-        # Add channel
-        add = ET.SubElement(root, "Add", {
-            "OfficeClientEdition": "32" if config["architecture"] == 0 else "64",
-            "Channel": "PerpetualVL2021"
-        })
+        parts = [
+            '<?xml version="1.0" encoding="UTF-8"?>\n',
+            f'<Configuration><Add OfficeClientEdition="{edition}" Channel="PerpetualVL2021">'
+        ]
         
         # Add selected products
-        for product_idx in config["products"]:
-            product_id = product_map[list(product_map.keys())[product_idx]]
-            product = ET.SubElement(add, "Product", {"ID": product_id})
-            ET.SubElement(product, "Language", {"ID": config["language"]})
+        for product_idx in products:
+            product_id = _PRODUCT_MAP[_PRODUCT_KEYS[product_idx]]
+            parts.append(f'<Product ID="{product_id}"><Language ID={language} /></Product>')
         
-        # Add display settings
-        display = ET.SubElement(root, "Display", {
-            "Level": "Full",
-            "AcceptEULA": "TRUE"
-        })
-        
-        # Add property settings
-        property_elem = ET.SubElement(root, "Property", {"Name": "AUTOACTIVATE", "Value": "0"})
-        
-        # Convert to string
-        xml_str = '<?xml version="1.0" encoding="UTF-8"?>\n'
-        xml_str += ET.tostring(root, encoding="unicode")
+        # Add display and property settings
+        parts.append(
+            '</Add>'
+            '<Display Level="Full" AcceptEULA="TRUE" />'
+            '<Property Name="AUTOACTIVATE" Value="0" />'
+            '</Configuration>'
+        )
         
-        return xml_str
+        return "".join(parts)
     
     def _deploy_office(self, ui):
         """Deploy Office LTSC using configuration"""
@@ -178,11 +407,15 @@ class OfficeLTSCManager:
             return
             
         # Check if configuration exists
-        config_path = os.path.join(self.odt_path, "configuration.xml")
-        if not os.path.exists(config_path):
+        config_path = self._config_path
+        if not os.path.isfile(config_path):
             ui.display_error("Configuration file not found. Please configure deployment first.")
             return
         
+        if not self._validate_config_xml(config_path):
+            ui.display_error("Configuration file is not a valid ODT configuration. Please configure deployment again.")
+            return
+        
         # Confirm with user
         if not ui.confirm("WARNING: This will install Office LTSC using your volume license. Continue?"):
             ui.display_info("Deployment cancelled")
@@ -200,11 +433,13 @@ class OfficeLTSCManager:
         # Run deployment
         try:
             ui.display_info("Starting Office LTSC deployment...")
-            setup_path = os.path.join(self.odt_path, "setup.exe")
-            
             result = subprocess.run(
-                [setup_path, "/configure", config_path],
-                check=True
+                [self._setup_path, "/configure", config_path],
+                cwd=self.odt_path,
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                creationflags=_NO_WINDOW
             )
             
             if result.returncode == 0:
@@ -227,26 +462,21 @@ class OfficeLTSCManager:
             return
         
         # Create removal configuration
-        remove_xml = """<?xml version="1.0" encoding="UTF-8"?>
-<Configuration>
-  <Remove All="TRUE" />
-  <Display Level="Full" AcceptEULA="TRUE" />
-</Configuration>
-"""
-        
         remove_path = os.path.join(self.odt_path, "remove_config.xml")
         
         try:
-            with open(remove_path, "w") as f:
-                f.write(remove_xml)
+            with open(remove_path, "wb") as f:
+                f.write(self.REMOVE_CONFIG_XML.encode("utf-8"))
             
             # Run removal
             ui.display_info("Removing Office installations...")
-            setup_path = os.path.join(self.odt_path, "setup.exe")
-            
             result = subprocess.run(
-                [setup_path, "/configure", remove_path],
-                check=True
+                [self._setup_path, "/configure", remove_path],
+                cwd=self.odt_path,
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                creationflags=_NO_WINDOW
             )
             
             if result.returncode == 0:
@@ -258,9 +488,23 @@ class OfficeLTSCManager:
             ui.display_error(f"Removal error: {str(e)}")
             self.logger.error(f"Removal error: {str(e)}")
     
+    def _validate_config_xml(self, config_path: str) -> bool:
+        """Check that a configuration file is well-formed XML with a <Configuration> root"""
+        root_tag = None
+        try:
+            # Stream through the whole document so truncated files are caught
+            for _, elem in ET.iterparse(config_path, events=("start",)):
+                if root_tag is None:
+                    root_tag = elem.tag
+        except (ET.ParseError, OSError) as e:
+            self.logger.error(f"Invalid configuration file {config_path}: {str(e)}")
+            return False
+        return root_tag == "Configuration"
+    
     def _check_odt(self, ui):
         """Check if ODT is downloaded and available"""
-        if not self.odt_path or not os.path.exists(self.odt_path):
+        # setup.exe is what every action runs, so it is the one file worth checking
+        if not self._setup_path or not os.path.isfile(self._setup_path):
             ui.display_error("Office Deployment Tool not found. Please download it first.")
             return False
         return True
@@ -268,9 +512,11 @@ class OfficeLTSCManager:
     def cleanup(self):
         """Clean up temporary files"""
         if self.temp_dir and os.path.exists(self.temp_dir):
-            import shutil
             try:
                 shutil.rmtree(self.temp_dir)
                 self.logger.info(f"Removed temporary directory: {self.temp_dir}")
             except Exception as e:
-                self.logger.error(f"Error cleaning up: {str(e)}")
\ No newline at end of file
+                self.logger.error(f"Error cleaning up: {str(e)}")
+        
+        self.temp_dir = None
+        self.odt_path = None
\ No newline at end of file
@@ -8,9 +8,52 @@ import os
 import subprocess
 import logging
 import json
+import re
+import functools
 import winreg
 from typing import Dict, Any, List, Optional
 
+# GUID printed by "powercfg -duplicatescheme"
+_GUID_RE = re.compile(r"([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})", re.IGNORECASE)
+
+# UserPreferencesMask with animations and other visual effects turned off
+_VISUAL_FX_MASK = b"\x90\x12\x01\x80"
+
+# Environment variable carrying Defender exclusion folders to PowerShell,
+# one per line; Windows paths cannot contain control characters
+_EXCLUSION_PATHS_VAR = "DEVTOOLKIT_EXCLUSION_PATHS"
+
+# Development-related Windows features as (feature name, display name)
+_DEV_FEATURES = (
+    ("Microsoft-Windows-Subsystem-Linux", "Windows Subsystem for Linux (WSL)"),
+    ("VirtualMachinePlatform", "Virtual Machine Platform (for WSL2)"),
+    ("NetFx3", ".NET Framework 3.5"),
+    ("NetFx4-AdvSrvs", ".NET Framework 4.8 Advanced Services"),
+    ("IIS-WebServerRole", "Internet Information Services (IIS)"),
+    ("HypervisorPlatform", "Hyper-V Platform"),
+    ("Containers", "Windows Containers"),
+    ("Microsoft-Hyper-V-All", "Hyper-V"),
+    ("Microsoft-Windows-NetFx3-OC-Package", ".NET Framework 3.5 (includes 2.0 and 3.0)")
+)
+_DEV_FEATURE_NAMES = tuple(name for _, name in _DEV_FEATURES)
+
+# System optimizations, in the order _optimize_system dispatches them
+_OPTIMIZATIONS = (
+    "Adjust for best performance of: Programs",
+    "Disable unnecessary visual effects",
+    "Configure power settings for high performance",
+    "Adjust virtual memory settings",
+    "Set proper pagefile size"
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _total_ram_bytes() -> int:
+    """Total physical memory, which cannot change while the process runs"""
+    import psutil
+    return psutil.virtual_memory().total
+
+
 class WindowsConfigManager:
     """
     Manages Windows configurations for development environments
@@ -58,7 +101,8 @@ class WindowsConfigManager:
             # Set registry keys for Developer Mode
             key_path = r"SOFTWARE\Microsoft\Windows\CurrentVersion\AppModelUnlock"
             
-            with winreg.CreateKey(winreg.HKEY_LOCAL_MACHINE, key_path) as key:
+            with winreg.CreateKeyEx(winreg.HKEY_LOCAL_MACHINE, key_path, 0,
+                                    winreg.KEY_SET_VALUE | winreg.KEY_WOW64_64KEY) as key:
                 winreg.SetValueEx(key, "AllowDevelopmentWithoutDevLicense", 0, winreg.REG_DWORD, 1)
                 winreg.SetValueEx(key, "AllowAllTrustedApps", 0, winreg.REG_DWORD, 1)
             
@@ -73,30 +117,16 @@ class WindowsConfigManager:
         """Configure Windows Features for development"""
         ui.display_info("Configuring Windows Features for development...")
         
-        # Define development-related Windows features
-        features = [
-            ("Microsoft-Windows-Subsystem-Linux", "Windows Subsystem for Linux (WSL)"),
-            ("VirtualMachinePlatform", "Virtual Machine Platform (for WSL2)"),
-            ("NetFx3", ".NET Framework 3.5"),
-            ("NetFx4-AdvSrvs", ".NET Framework 4.8 Advanced Services"),
-            ("IIS-WebServerRole", "Internet Information Services (IIS)"),
-            ("HypervisorPlatform", "Hyper-V Platform"),
-            ("Containers", "Windows Containers"),
-            ("Microsoft-Hyper-V-All", "Hyper-V"),
-            ("Microsoft-Windows-NetFx3-OC-Package", ".NET Framework 3.5 (includes 2.0 and 3.0)")
-        ]
-        
         # Let user select features to install
-        feature_names = [f[1] for f in features]
-        selected_indices = ui.prompt_multichoice("Select features to install:", feature_names)
+        selected_indices = ui.prompt_multichoice("Select features to install:", _DEV_FEATURE_NAMES)
         
         if not selected_indices:
             ui.display_info("No features selected")
             return
             
         # Confirm with user
-        selected_features = [features[i][0] for i in selected_indices]
-        selected_names = [features[i][1] for i in selected_indices]
+        selected_features = [_DEV_FEATURES[i][0] for i in selected_indices]
+        selected_names = [_DEV_FEATURES[i][1] for i in selected_indices]
         
         ui.display_info("You selected the following features:")
         for name in selected_names:
@@ -106,26 +136,31 @@ class WindowsConfigManager:
             ui.display_info("Operation cancelled")
             return
         
-        # Install selected features
-        for feature in selected_features:
-            ui.display_info(f"Installing: {feature}")
+        # Install all selected features with a single DISM run, which accepts
+        # several /featurename arguments and only initializes servicing once
+        ui.display_info(f"Installing: {', '.join(selected_features)}")
+        
+        try:
+            result = subprocess.run(
+                ["dism", "/online", "/enable-feature"]
+                + [f"/featurename:{feature}" for feature in selected_features]
+                + ["/all", "/norestart"],
+                capture_output=True,
+                text=True,
+                check=False
+            )
             
-            try:
-                result = subprocess.run(
-                    ["dism", "/online", "/enable-feature", f"/featurename:{feature}", "/all", "/norestart"],
-                    capture_output=True,
-                    text=True,
-                    check=False
-                )
-                
-                if result.returncode == 0:
+            if result.returncode == 0:
+                for feature in selected_features:
                     ui.display_success(f"Successfully installed {feature}")
-                else:
-                    ui.display_error(f"Failed to install {feature}: {result.stderr}")
-                    
-            except Exception as e:
-                ui.display_error(f"Error installing {feature}: {str(e)}")
-                self.logger.error(f"Feature installation error: {str(e)}")
+            else:
+                # DISM reports its errors on stdout rather than stderr
+                ui.display_error(f"Failed to install {', '.join(selected_features)}: {result.stderr or result.stdout}")
+                self.logger.error(f"DISM exited with code {result.returncode}: {result.stdout}")
+                
+        except Exception as e:
+            ui.display_error(f"Error installing features: {str(e)}")
+            self.logger.error(f"Feature installation error: {str(e)}")
         
         ui.display_info("Feature installation completed")
         ui.display_warning("Some changes may require a system restart to take effect")
@@ -134,15 +169,7 @@ class WindowsConfigManager:
         """Optimize system performance for development work"""
         ui.display_info("Optimizing system for development...")
         
-        optimizations = [
-            "Adjust for best performance of: Programs",
-            "Disable unnecessary visual effects",
-            "Configure power settings for high performance",
-            "Adjust virtual memory settings",
-            "Set proper pagefile size"
-        ]
-        
-        selected_indices = ui.prompt_multichoice("Select optimizations to apply:", optimizations)
+        selected_indices = ui.prompt_multichoice("Select optimizations to apply:", _OPTIMIZATIONS)
         
         if not selected_indices:
             ui.display_info("No optimizations selected")
@@ -172,7 +199,8 @@ class WindowsConfigManager:
         """Set system for best performance of programs"""
         try:
             key_path = r"SYSTEM\CurrentControlSet\Control\PriorityControl"
-            with winreg.CreateKey(winreg.HKEY_LOCAL_MACHINE, key_path) as key:
+            with winreg.CreateKeyEx(winreg.HKEY_LOCAL_MACHINE, key_path, 0,
+                                    winreg.KEY_SET_VALUE | winreg.KEY_WOW64_64KEY) as key:
                 winreg.SetValueEx(key, "Win32PrioritySeparation", 0, winreg.REG_DWORD, 2)
                 
             ui.display_success("System adjusted for best program performance")
@@ -186,13 +214,15 @@ class WindowsConfigManager:
         try:
             # Set visual effects for performance
             key_path = r"Software\Microsoft\Windows\CurrentVersion\Explorer\VisualEffects"
-            with winreg.CreateKey(winreg.HKEY_CURRENT_USER, key_path) as key:
+            with winreg.CreateKeyEx(winreg.HKEY_CURRENT_USER, key_path, 0,
+                                    winreg.KEY_SET_VALUE | winreg.KEY_WOW64_64KEY) as key:
                 winreg.SetValueEx(key, "VisualFXSetting", 0, winreg.REG_DWORD, 2)
                 
             # Advanced system settings
             key_path = r"Control Panel\Desktop"
-            with winreg.CreateKey(winreg.HKEY_CURRENT_USER, key_path) as key:
-                winreg.SetValueEx(key, "UserPreferencesMask", 0, winreg.REG_BINARY, b"\x90\x12\x01\x80")
+            with winreg.CreateKeyEx(winreg.HKEY_CURRENT_USER, key_path, 0,
+                                    winreg.KEY_SET_VALUE | winreg.KEY_WOW64_64KEY) as key:
+                winreg.SetValueEx(key, "UserPreferencesMask", 0, winreg.REG_BINARY, _VISUAL_FX_MASK)
                 
             ui.display_success("Visual effects optimized for performance")
             ui.display_info("Some changes may require logging out and back in to take effect")
@@ -225,8 +255,7 @@ class WindowsConfigManager:
                 
                 if create_result.returncode == 0:
                     # Extract the GUID of the created plan
-                    import re
-                    match = re.search(r"([a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12})", create_result.stdout)
+                    match = _GUID_RE.search(create_result.stdout)
                     if match:
                         guid = match.group(1)
                         # Set the created plan as active
@@ -264,8 +293,7 @@ class WindowsConfigManager:
         
         # Show system RAM
         try:
-            import psutil
-            ram_gb = round(psutil.virtual_memory().total / (1024**3), 2)
+            ram_gb = round(_total_ram_bytes() / (1024**3), 2)
             ui.display_info(f"Your system has approximately {ram_gb} GB of RAM")
             ui.display_info(f"Recommended pagefile: Initial {int(ram_gb*1024)} MB, Max {int(ram_gb*1024*2)} MB")
         except ImportError:
@@ -277,18 +305,21 @@ class WindowsConfigManager:
         """Configure Windows Defender exceptions for development folders"""
         ui.display_info("Configuring Windows Defender exceptions for development...")
         
-        # Get development folders from user
-        folders = []
+        # Get development folders from user, ignoring repeats of the same folder
+        unique_folders = {}
         while True:
             folder = ui.prompt_input("Enter development folder path (leave empty to finish):")
             if not folder:
                 break
                 
-            if os.path.exists(folder):
-                folders.append(folder)
+            path = os.path.abspath(folder)
+            if os.path.isdir(path):
+                unique_folders.setdefault(os.path.normcase(path), path)
             else:
                 ui.display_warning(f"Path does not exist: {folder}")
         
+        folders = list(unique_folders.values())
+        
         if not folders:
             ui.display_info("No folders specified")
             return
@@ -302,23 +333,26 @@ class WindowsConfigManager:
             ui.display_info("Operation cancelled")
             return
         
-        # Add folders as exceptions
-        for folder in folders:
-            try:
-                result = subprocess.run(
-                    ["powershell", "-Command", f"Add-MpPreference -ExclusionPath '{folder}'"],
-                    capture_output=True,
-                    text=True,
-                    check=False
-                )
-                
-                if result.returncode == 0:
+        # Add all folders in one PowerShell process; the folders travel in an
+        # environment variable so they are never parsed as PowerShell code
+        try:
+            result = subprocess.run(
+                ["powershell", "-NoProfile", "-Command",
+                 f"Add-MpPreference -ExclusionPath $env:{_EXCLUSION_PATHS_VAR}.Split([char]10)"],
+                env=dict(os.environ, **{_EXCLUSION_PATHS_VAR: "\n".join(folders)}),
+                capture_output=True,
+                text=True,
+                check=False
+            )
+            
+            if result.returncode == 0:
+                for folder in folders:
                     ui.display_success(f"Added exception for: {folder}")
-                else:
-                    ui.display_error(f"Failed to add exception for {folder}: {result.stderr}")
-                    
-            except Exception as e:
-                ui.display_error(f"Error adding exception: {str(e)}")
-                self.logger.error(f"Defender exception error: {str(e)}")
+            else:
+                ui.display_error(f"Failed to add exceptions: {result.stderr}")
+                
+        except Exception as e:
+            ui.display_error(f"Error adding exception: {str(e)}")
+            self.logger.error(f"Defender exception error: {str(e)}")
         
         ui.display_success("Windows Defender exceptions configured")
\ No newline at end of file
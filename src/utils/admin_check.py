@@ -7,11 +7,15 @@ is running with administrator privileges.
 import os
 import sys
 import logging
+import functools
 
+@functools.lru_cache(maxsize=1)
 def verify_admin_privileges():
     """
     Check if the script is running with administrator privileges.
     
+    The result is cached, since elevation cannot change within a process.
+    
     Returns:
         bool: True if running as administrator, False otherwise
     """
@@ -5,11 +5,56 @@ This module provides functionality for cleaning up temporary files,
 resources, and registry entries created during toolkit execution.
 """
 import os
+import atexit
 import sys
-import shutil
+import stat
+import struct
 import tempfile
 import logging
-from typing import List, Dict, Any
+import winreg
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Set, Tuple, Optional
+
+# Registry hive names accepted in backup key paths
+_ROOT_KEY_MAP = {
+    "HKEY_CURRENT_USER": winreg.HKEY_CURRENT_USER,
+    "HKEY_LOCAL_MACHINE": winreg.HKEY_LOCAL_MACHINE,
+    "HKEY_CLASSES_ROOT": winreg.HKEY_CLASSES_ROOT,
+    "HKEY_USERS": winreg.HKEY_USERS,
+    "HKEY_CURRENT_CONFIG": winreg.HKEY_CURRENT_CONFIG
+}
+_ROOT_KEY_NAMES = {root_key: name for name, root_key in _ROOT_KEY_MAP.items()}
+
+
+def _unlink_quietly(path: str):
+    """Remove a file, ignoring errors"""
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _is_reparse_point(entry: os.DirEntry) -> bool:
+    """Check whether a directory entry is a junction or other reparse point"""
+    # Windows serves this stat from the directory listing, so it costs no syscall
+    if os.name != "nt":
+        return False
+    return bool(entry.stat(follow_symlinks=False).st_file_attributes & stat.FILE_ATTRIBUTE_REPARSE_POINT)
+
+
+def _unlink_or_push(entry: os.DirEntry, stack: List[Tuple[str, bool]]):
+    """Queue a real subdirectory for the tree walk, or unlink any other entry"""
+    try:
+        if entry.is_dir(follow_symlinks=False) and not _is_reparse_point(entry):
+            stack.append((entry.path, False))
+        else:
+            # On Windows this also removes junctions and directory
+            # symlinks without touching their targets
+            os.unlink(entry.path)
+    except OSError:
+        pass
+
 
 class CleanupManager:
     """
@@ -17,64 +62,231 @@ class CleanupManager:
     Ensures all temporary artifacts are properly removed on exit.
     """
     
+    # Upper bound on directory trees removed at the same time
+    MAX_RMTREE_WORKERS = 8
+    
     def __init__(self):
         """Initialize the cleanup manager"""
         self.logger = logging.getLogger("cleanup")
-        self.temp_dirs = []
-        self.temp_files = []
-        self.registry_backups = {}
+        self.temp_dirs: Set[str] = set()
+        self.temp_files: Set[str] = set()
+        self.registry_backups: Dict[Tuple[int, str], Dict] = {}
+        self._finalizers: Dict[str, weakref.finalize] = {}
+        self._ran = False
+        # Resolve once; gettempdir consults several environment variables
+        self._temp_root = os.path.join(os.path.normcase(os.path.realpath(tempfile.gettempdir())), "")
         self._register_exit_handler()
         
     def _register_exit_handler(self):
         """Register exit handler to ensure cleanup on program exit"""
-        import atexit
         atexit.register(self.run)
         
-    def add_temp_dir(self, path: str):
+    def fast_exit(self, code: int = 0):
+        """Clean up and terminate immediately, skipping unrelated exit handlers"""
+        # Intended as the last call of a standalone CLI run; when embedded in
+        # another process prefer sys.exit so that process's handlers still run
+        try:
+            self.run()
+        finally:
+            # os._exit skips interpreter teardown, so flush buffered output first
+            logging.shutdown()
+            for stream in (sys.stdout, sys.stderr):
+                try:
+                    stream.flush()
+                except Exception:
+                    pass
+            os._exit(code)
+            
+    def _mark_pending(self):
+        """Re-arm cleanup when new items arrive after a completed run"""
+        if self._ran:
+            self._ran = False
+            self._register_exit_handler()
+            
+    def _is_temp_path(self, path: str) -> bool:
+        """Check that a path lives strictly inside the system temp directory"""
+        if os.path.normcase(os.path.realpath(path)).startswith(self._temp_root):
+            return True
+            
+        self.logger.warning(f"Refusing to register non-temp path for cleanup: {path}")
+        return False
+        
+    def _add_finalizer(self, path: str, remove):
+        """Remove a path when this manager is collected, but not at interpreter exit"""
+        if path in self._finalizers:
+            return
+            
+        finalizer = weakref.finalize(self, remove, path)
+        finalizer.atexit = False
+        self._finalizers[path] = finalizer
+        self._mark_pending()
+        self.logger.debug("Registered non-critical temp path for cleanup: %s", path)
+        
+    def add_temp_dir(self, path: str, critical: bool = True):
         """Add a temporary directory to be cleaned up"""
-        if os.path.exists(path) and os.path.isdir(path):
-            self.temp_dirs.append(path)
-            self.logger.info(f"Registered temp directory for cleanup: {path}")
+        # A single stat tells us both whether it exists and what it is
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+            
+        if not stat.S_ISDIR(st.st_mode) or not self._is_temp_path(path):
+            return
+            
+        # Non-critical directories are skipped at exit to keep shutdown fast
+        if not critical:
+            self._add_finalizer(path, self._rmtree_quietly)
+        elif path not in self.temp_dirs:
+            self.temp_dirs.add(path)
+            self._mark_pending()
+            self.logger.debug("Registered temp directory for cleanup: %s", path)
             
-    def add_temp_file(self, path: str):
+    def add_temp_file(self, path: str, critical: bool = True):
         """Add a temporary file to be cleaned up"""
-        if os.path.exists(path) and os.path.isfile(path):
-            self.temp_files.append(path)
-            self.logger.info(f"Registered temp file for cleanup: {path}")
+        # A single stat tells us both whether it exists and what it is
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+            
+        if not stat.S_ISREG(st.st_mode) or not self._is_temp_path(path):
+            return
+            
+        # Non-critical files are skipped at exit to keep shutdown fast
+        if not critical:
+            self._add_finalizer(path, _unlink_quietly)
+        elif path not in self.temp_files:
+            self.temp_files.add(path)
+            self._mark_pending()
+            self.logger.debug("Registered temp file for cleanup: %s", path)
             
     def add_registry_backup(self, key_path: str, backup_data: Dict):
         """Add a registry backup for potential restoration"""
-        self.registry_backups[key_path] = backup_data
-        self.logger.info(f"Registered registry backup for: {key_path}")
+        # Resolve the hive once here so restoring is a flat walk over keys
+        root_key_str, _, sub_key = key_path.partition('\\')
+        root_key = _ROOT_KEY_MAP.get(root_key_str)
+        if root_key is None or not sub_key:
+            self.logger.warning(f"Ignoring registry backup for unsupported key: {key_path}")
+            return
+            
+        self.registry_backups[(root_key, sub_key)] = backup_data
+        self.logger.debug("Registered registry backup for: %s", key_path)
         
     def run(self):
         """Run the cleanup process"""
-        self.logger.info("Starting cleanup process")
+        # Explicit calls and the atexit hook may both land here; only the first does work
+        if self._ran:
+            return
+        self._ran = True
+        atexit.unregister(self.run)
+        
+        self.logger.debug("Starting cleanup process")
+        removed_files = 0
+        errors = 0
         
-        # Clean up temporary files
-        for file_path in self.temp_files:
+        # Clean up temporary files, treating already-deleted ones as done
+        for file_path in list(self.temp_files):
             try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    self.logger.info(f"Removed temporary file: {file_path}")
+                os.unlink(file_path)
+                removed_files += 1
+                self.logger.debug("Removed temporary file: %s", file_path)
+            except FileNotFoundError:
+                pass
             except Exception as e:
+                errors += 1
                 self.logger.error(f"Error removing temporary file {file_path}: {str(e)}")
                 
-        # Clean up temporary directories
-        for dir_path in self.temp_dirs:
+        # Clean up independent temporary directory trees concurrently
+        dir_paths = self._outermost_dirs(self.temp_dirs)
+        dir_results = []
+        if len(dir_paths) > 1:
             try:
-                if os.path.exists(dir_path):
-                    shutil.rmtree(dir_path, ignore_errors=True)
-                    self.logger.info(f"Removed temporary directory: {dir_path}")
-            except Exception as e:
-                self.logger.error(f"Error removing temporary directory {dir_path}: {str(e)}")
+                with ThreadPoolExecutor(max_workers=min(self.MAX_RMTREE_WORKERS, len(dir_paths))) as executor:
+                    dir_results = list(executor.map(self._remove_temp_dir, dir_paths))
+                dir_paths = []
+            except RuntimeError:
+                # Executors refuse new work once interpreter shutdown has begun,
+                # which is when the atexit handler runs
+                pass
                 
-        # Clear lists after cleanup
-        self.temp_files = []
-        self.temp_dirs = []
+        dir_results.extend(self._remove_temp_dir(dir_path) for dir_path in dir_paths)
+        removed_dirs = dir_results.count(True)
+        errors += dir_results.count(None)
+            
+        # Run pending non-critical removals; each finalizer fires at most once
+        for finalizer in self._finalizers.values():
+            finalizer()
+            
+        # Clear registrations after cleanup
+        self.temp_files.clear()
+        self.temp_dirs.clear()
+        self._finalizers.clear()
+        
+        self.logger.info("Cleanup: removed %d files, %d dirs, %d errors", removed_files, removed_dirs, errors)
+        
+    @staticmethod
+    def _outermost_dirs(dir_paths) -> List[str]:
+        """Drop directories nested inside another registered directory"""
+        # Sorting puts every parent directly ahead of its children
+        keyed = sorted((os.path.normcase(os.path.abspath(path)), path) for path in dir_paths)
         
-        self.logger.info("Cleanup process completed")
+        outermost = []
+        last_root = None
+        for norm_path, path in keyed:
+            if last_root is not None and norm_path.startswith(last_root):
+                continue
+            outermost.append(path)
+            last_root = os.path.join(norm_path, "")
+            
+        return outermost
         
+    def _remove_temp_dir(self, dir_path: str) -> Optional[bool]:
+        """Remove a single temporary directory tree; None means it failed"""
+        try:
+            self._fast_rmtree(dir_path)
+            self.logger.debug("Removed temporary directory: %s", dir_path)
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            self.logger.error(f"Error removing temporary directory {dir_path}: {str(e)}")
+            return None
+            
+    @staticmethod
+    def _fast_rmtree(path: str):
+        """Remove a directory tree, ignoring errors below the top-level path"""
+        # Iterative post-order walk; DirEntry answers the type check from the
+        # directory listing itself, so no extra stat is issued per entry
+        stack = [(path, False)]
+        while stack:
+            dir_path, visited = stack.pop()
+            if visited:
+                try:
+                    os.rmdir(dir_path)
+                except OSError:
+                    pass
+                continue
+                
+            stack.append((dir_path, True))
+            try:
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        _unlink_or_push(entry, stack)
+            except FileNotFoundError:
+                # Report a missing top-level directory so callers can skip it
+                if dir_path == path:
+                    raise
+            except OSError:
+                pass
+                
+    @staticmethod
+    def _rmtree_quietly(path: str):
+        """Remove a directory tree, treating a missing one as already removed"""
+        try:
+            CleanupManager._fast_rmtree(path)
+        except FileNotFoundError:
+            pass
+            
     def restore_registry_backups(self):
         """Restore registry backups if needed"""
         if not self.registry_backups:
@@ -82,40 +294,120 @@ class CleanupManager:
             
         self.logger.info("Restoring registry backups")
         
-        import winreg
-        
-        for key_path, backup_data in self.registry_backups.items():
+        # Apply everything in one kernel transaction when KTM is available
+        if self._restore_transacted():
+            self.registry_backups = {}
+            return
+            
+        for (root_key, sub_key), backup_data in self.registry_backups.items():
+            key_path = f"{_ROOT_KEY_NAMES[root_key]}\\{sub_key}"
             try:
-                key_parts = key_path.split('\\', 1)
-                if len(key_parts) != 2:
-                    continue
-                    
-                root_key_str, sub_key = key_parts
-                
-                # Map string to root key constant
-                root_key_map = {
-                    "HKEY_CURRENT_USER": winreg.HKEY_CURRENT_USER,
-                    "HKEY_LOCAL_MACHINE": winreg.HKEY_LOCAL_MACHINE,
-                    "HKEY_CLASSES_ROOT": winreg.HKEY_CLASSES_ROOT,
-                    "HKEY_USERS": winreg.HKEY_USERS,
-                    "HKEY_CURRENT_CONFIG": winreg.HKEY_CURRENT_CONFIG
-                }
-                
-                if root_key_str not in root_key_map:
-                    continue
-                    
-                root_key = root_key_map[root_key_str]
-                
                 # Open the key
                 with winreg.CreateKey(root_key, sub_key) as key:
                     # Restore values
                     for value_name, (value_type, value_data) in backup_data.items():
                         winreg.SetValueEx(key, value_name, 0, value_type, value_data)
                         
-                self.logger.info(f"Restored registry backup for: {key_path}")
+                self.logger.debug("Restored registry backup for: %s", key_path)
                 
             except Exception as e:
                 self.logger.error(f"Error restoring registry backup for {key_path}: {str(e)}")
                 
         # Clear backups after restoration
-        self.registry_backups = {}
\ No newline at end of file
+        self.registry_backups = {}
+        
+    @staticmethod
+    def _pack_reg_value(value_type: int, value_data: Any) -> bytes:
+        """Encode a value the way RegSetValueExW expects it"""
+        if value_type == winreg.REG_DWORD:
+            return struct.pack("<I", value_data)
+        if value_type == winreg.REG_QWORD:
+            return struct.pack("<Q", value_data)
+        if value_type in (winreg.REG_SZ, winreg.REG_EXPAND_SZ):
+            return (str(value_data) + "\0").encode("utf-16-le")
+        if value_type == winreg.REG_MULTI_SZ:
+            return ("".join(f"{item}\0" for item in value_data) + "\0").encode("utf-16-le")
+        return bytes(value_data or b"")
+        
+    @staticmethod
+    def _load_ktm_apis():
+        """Load and prototype the KTM and transacted registry APIs, or None when unavailable"""
+        try:
+            import ctypes
+            from ctypes import wintypes
+            ktmw32 = ctypes.WinDLL("ktmw32", use_last_error=True)
+            advapi32 = ctypes.WinDLL("advapi32", use_last_error=True)
+            kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        except (ImportError, AttributeError, OSError):
+            return None
+            
+        ktmw32.CreateTransaction.restype = wintypes.HANDLE
+        advapi32.RegCreateKeyTransactedW.argtypes = [
+            wintypes.HKEY, wintypes.LPCWSTR, wintypes.DWORD, wintypes.LPWSTR, wintypes.DWORD,
+            wintypes.DWORD, wintypes.LPVOID, ctypes.POINTER(wintypes.HKEY),
+            ctypes.POINTER(wintypes.DWORD), wintypes.HANDLE, wintypes.LPVOID
+        ]
+        advapi32.RegCreateKeyTransactedW.restype = wintypes.LONG
+        advapi32.RegSetValueExW.argtypes = [
+            wintypes.HKEY, wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD,
+            ctypes.c_char_p, wintypes.DWORD
+        ]
+        advapi32.RegSetValueExW.restype = wintypes.LONG
+        advapi32.RegCloseKey.argtypes = [wintypes.HKEY]
+        ktmw32.CommitTransaction.argtypes = [wintypes.HANDLE]
+        ktmw32.RollbackTransaction.argtypes = [wintypes.HANDLE]
+        kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+        return ktmw32, advapi32, kernel32
+        
+    def _restore_key_transacted(self, advapi32, transaction, root_key: int, sub_key: str, backup_data: Dict):
+        """Create one key inside the transaction and write back its saved values"""
+        import ctypes
+        from ctypes import wintypes
+        
+        key = wintypes.HKEY()
+        result = advapi32.RegCreateKeyTransactedW(
+            root_key, sub_key, 0, None, 0, winreg.KEY_SET_VALUE,
+            None, ctypes.byref(key), None, transaction, None
+        )
+        if result != 0:
+            raise ctypes.WinError(result)
+            
+        try:
+            for value_name, (value_type, value_data) in backup_data.items():
+                data = self._pack_reg_value(value_type, value_data)
+                result = advapi32.RegSetValueExW(key, value_name, 0, value_type, data, len(data))
+                if result != 0:
+                    raise ctypes.WinError(result)
+        finally:
+            advapi32.RegCloseKey(key)
+            
+    def _restore_transacted(self) -> bool:
+        """Restore all backups atomically through a KTM transaction"""
+        apis = self._load_ktm_apis()
+        if apis is None:
+            return False
+        ktmw32, advapi32, kernel32 = apis
+        
+        import ctypes
+        from ctypes import wintypes
+        transaction = ktmw32.CreateTransaction(None, None, 0, 0, 0, 0, None)
+        if not transaction or transaction == wintypes.HANDLE(-1).value:
+            return False
+            
+        try:
+            for (root_key, sub_key), backup_data in self.registry_backups.items():
+                self._restore_key_transacted(advapi32, transaction, root_key, sub_key, backup_data)
+                
+            if not ktmw32.CommitTransaction(transaction):
+                raise ctypes.WinError(ctypes.get_last_error())
+                
+        except Exception as e:
+            # Nothing was applied; let the per-key path restore what it can
+            ktmw32.RollbackTransaction(transaction)
+            self.logger.error(f"Transacted registry restore failed: {str(e)}")
+            return False
+        finally:
+            kernel32.CloseHandle(transaction)
+            
+        self.logger.info(f"Restored {len(self.registry_backups)} registry backups in one transaction")
+        return True
@@ -6,13 +6,56 @@ caching detection results, and optimizing performance through pattern matching.
 """
 import os
 import re
+import shutil
 import json
+import hashlib
 import logging
+import platform
 import subprocess
+import time
+import threading
 import winreg
-import hashlib
-from typing import Dict, Any, List, Set, Optional, Tuple, Pattern, Match
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
+
+# DISM writes to pipes in the console (OEM) code page
+_DISM_ENCODING = 'oem' if os.name == 'nt' else 'utf-8'
+
+# Dotted version core shared by most tool version outputs
+_SEMVER = re.compile(rb'(\d+\.\d+\.\d+)')
+
+# Patterns used on hot paths, bound at module level to skip the PATTERNS lookups
+_PAT_GIT = re.compile(rb'git version\s+(.+)')
+_PAT_DISM_LISTING = re.compile(rb'Feature Name\s*:\s*(.+?)\r?\nState\s*:\s*(\w+)')
+_PAT_WINDOWS_VERSION = re.compile(r'ProductName\s+Windows\s+(\d+)')
+
+# "Key : Value" lines in DISM output, matched in one pass over the whole buffer
+_KV_RE = re.compile(rb'^[ \t]*([^:\r\n]+?)[ \t]*:[ \t]*(.*?)[ \t\r]*$', re.M)
+
+# Last cache file parsed in this process, keyed by (path, mtime_ns, size)
+_CACHE_SNAPSHOT: Dict[str, Any] = {'key': None, 'data': {}, 'hash': None}
+
+
+def _cache_file_key(cache_path: str) -> Tuple[str, int, int]:
+    """Identify a cache file version without reading it"""
+    st = os.stat(cache_path)
+    return (cache_path, st.st_mtime_ns, st.st_size)
+
+
+def _content_hash(buf: bytes) -> str:
+    """Hash cache file contents; stable across processes, unlike hash()"""
+    return hashlib.sha256(buf).hexdigest()
+
+
+def _volume_label(root: str) -> str:
+    """Read the label of a mounted volume"""
+    import ctypes
+    label = ctypes.create_unicode_buffer(261)
+    if ctypes.windll.kernel32.GetVolumeInformationW(root, label, len(label), None, None, None, None, 0):
+        return label.value
+    return ''
+
 
 class FeatureDetection:
     """
@@ -21,34 +64,44 @@ class FeatureDetection:
     """
     
     # Cache settings
-    CACHE_DIR = os.path.join(os.environ.get('LOCALAPPDATA', os.path.expanduser('~')), 
-                            'YourCompany', 'DevToolkit', 'cache')
+    CACHE_DIR = os.path.join(os.environ.get('LOCALAPPDATA', os.path.expanduser('~')),
+                             'YourCompany', 'DevToolkit', 'cache')
     CACHE_FILENAME = 'feature_cache.json'
     CACHE_EXPIRY = 24  # hours
+    CACHE_EXPIRY_SEC = CACHE_EXPIRY * 3600
+    
+    # Version probes for command line tools and the pattern matching their output
+    VERSION_PROBES = (
+        ('git', ('git', '--version'), _PAT_GIT),
+        ('node', ('node', '--version'), _SEMVER),
+        ('npm', ('npm', '--version'), _SEMVER),
+        ('python', ('python', '--version'), _SEMVER),
+        ('dotnet', ('dotnet', '--version'), _SEMVER),
+    )
     
     # Regex patterns for feature detection
     PATTERNS = {
         # Windows Feature detection patterns
         'windows_features': {
-            'installed': re.compile(r'State\s+:\s+(\d+)\s+Enabled'),
-            'available': re.compile(r'Feature Name\s+:\s+(.+)'),
+            # Matched against raw DISM output bytes
+            'listing': _PAT_DISM_LISTING,
         },
         
-        # Software detection patterns
+        # Software detection patterns, matched against raw version output bytes
         'software': {
-            'git': re.compile(r'git version\s+(.+)'),
-            'node': re.compile(r'v(\d+\.\d+\.\d+)'),
-            'npm': re.compile(r'(\d+\.\d+\.\d+)'),
-            'python': re.compile(r'Python\s+(\d+\.\d+\.\d+)'),
-            'dotnet': re.compile(r'(\d+\.\d+\.\d+)'),
+            'git': _PAT_GIT,
+            'node': _SEMVER,
+            'npm': _SEMVER,
+            'python': _SEMVER,
+            'dotnet': _SEMVER,
             'vs': re.compile(r'Visual Studio.+(\d{4})'),
-            'vscode': re.compile(r'(\d+\.\d+\.\d+)'),
+            'vscode': _SEMVER,
         },
         
         # Registry patterns
         'registry': {
             'dev_mode': re.compile(r'AppModelUnlock'),
-            'windows_version': re.compile(r'ProductName\s+Windows\s+(\d+)'),
+            'windows_version': _PAT_WINDOWS_VERSION,
             'build_number': re.compile(r'CurrentBuildNumber\s+(\d+)'),
         },
         
@@ -70,6 +123,13 @@ class FeatureDetection:
     def __init__(self):
         """Initialize the feature detection utility"""
         self.logger = logging.getLogger('feature_detection')
+        self._key_handles: Dict[Tuple[int, str], winreg.HKEYType] = {}
+        self._tool_paths: Dict[str, Optional[str]] = {}
+        self._feature_details: Dict[str, Dict[str, str]] = {}
+        self._cache_dirty = False
+        self._last_hash: Optional[str] = None
+        self._defer_cache_flush = False
+        self._cache_lock = threading.RLock()
         self._ensure_cache_dir()
         self.cache = self._load_cache()
     
@@ -81,7 +141,8 @@ class FeatureDetection:
             force_refresh: Force a refresh of cached data
             
         Returns:
-            Dictionary of detected Windows features
+            Dictionary mapping feature names to {'installed': bool};
+            use get_feature_details for the full DISM record of one feature
         """
         cache_key = 'windows_features'
         
@@ -92,53 +153,30 @@ class FeatureDetection:
                 return self.cache[cache_key]['data']
         
         self.logger.info(f"Detecting Windows features (forced={force_refresh})")
+        self._feature_details.clear()
         
         # Run detection command
         features = {}
         try:
             # Get list of all features
             result = subprocess.run(
-                ['dism', '/online', '/get-features', '/format:table'], 
-                capture_output=True, 
-                text=True,
+                ['dism', '/online', '/get-features', '/format:list'],
+                capture_output=True,
                 check=False
             )
             
             if result.returncode != 0:
-                self.logger.error(f"Error detecting Windows features: {result.stderr}")
+                stderr = result.stderr.decode(_DISM_ENCODING, 'replace')
+                self.logger.error(f"Error detecting Windows features: {stderr}")
                 return features
             
-            # Parse output with regex
-            feature_pattern = self.PATTERNS['windows_features']['available']
-            state_pattern = self.PATTERNS['windows_features']['installed']
-            
-            # Extract feature names
-            all_features = feature_pattern.findall(result.stdout)
-            
-            # Check state for each feature
-            for feature in all_features:
-                feature_name = feature.strip()
-                # Get detailed info for this feature
-                detail_result = subprocess.run(
-                    ['dism', '/online', '/get-featureinfo', f'/featurename:{feature_name}'],
-                    capture_output=True,
-                    text=True,
-                    check=False
-                )
-                
-                # Parse state
-                if detail_result.returncode == 0:
-                    state_match = state_pattern.search(detail_result.stdout)
-                    if state_match and state_match.group(1) == '1':
-                        features[feature_name] = {
-                            'installed': True,
-                            'details': self._extract_feature_details(detail_result.stdout)
-                        }
-                    else:
-                        features[feature_name] = {
-                            'installed': False,
-                            'details': self._extract_feature_details(detail_result.stdout)
-                        }
+            # Names and states come as adjacent pairs, so one sweep reads both;
+            # the output stays undecoded and only the captured names are decoded
+            listing = _PAT_DISM_LISTING.findall(result.stdout)
+            features = {
+                name.strip().decode(_DISM_ENCODING, 'replace'): {'installed': state == b'Enabled'}
+                for name, state in listing
+            }
             
             # Update cache
             self._update_cache(cache_key, features)
@@ -169,62 +207,30 @@ class FeatureDetection:
         
         self.logger.info(f"Detecting installed software (forced={force_refresh})")
         
-        # Run detection for various software
-        software = {}
-        
-        # Detect Git
-        try:
-            result = subprocess.run(['git', '--version'], capture_output=True, text=True, check=False)
-            if result.returncode == 0:
-                match = self.PATTERNS['software']['git'].search(result.stdout)
-                if match:
-                    software['git'] = {'installed': True, 'version': match.group(1)}
-        except Exception:
-            software['git'] = {'installed': False}
-        
-        # Detect Node.js
-        try:
-            result = subprocess.run(['node', '--version'], capture_output=True, text=True, check=False)
-            if result.returncode == 0:
-                match = self.PATTERNS['software']['node'].search(result.stdout)
-                if match:
-                    software['node'] = {'installed': True, 'version': match.group(1)}
-        except Exception:
-            software['node'] = {'installed': False}
-        
-        # Detect npm
-        try:
-            result = subprocess.run(['npm', '--version'], capture_output=True, text=True, check=False)
-            if result.returncode == 0:
-                match = self.PATTERNS['software']['npm'].search(result.stdout)
-                if match:
-                    software['npm'] = {'installed': True, 'version': match.group(1)}
-        except Exception:
-            software['npm'] = {'installed': False}
+        # A forced refresh should notice tools installed since the last lookup
+        if force_refresh:
+            self._tool_paths.clear()
         
-        # Detect Python
-        try:
-            result = subprocess.run(['python', '--version'], capture_output=True, text=True, check=False)
-            if result.returncode == 0:
-                match = self.PATTERNS['software']['python'].search(result.stdout)
-                if match:
-                    software['python'] = {'installed': True, 'version': match.group(1)}
-        except Exception:
-            software['python'] = {'installed': False}
+        # Run detection for various software; every probe is independent and
+        # spends its time waiting on a child process, so they run side by side
+        software = {}
+        with ThreadPoolExecutor(max_workers=len(self.VERSION_PROBES) + 2) as executor:
+            version_futures = [
+                (name, executor.submit(self._probe_version, command, pattern))
+                for name, command, pattern in self.VERSION_PROBES
+            ]
+            vs_future = executor.submit(self._detect_visual_studio_versions)
+            vscode_future = executor.submit(self._detect_vscode)
         
-        # Detect .NET
-        try:
-            result = subprocess.run(['dotnet', '--version'], capture_output=True, text=True, check=False)
-            if result.returncode == 0:
-                match = self.PATTERNS['software']['dotnet'].search(result.stdout)
-                if match:
-                    software['dotnet'] = {'installed': True, 'version': match.group(1)}
-        except Exception:
-            software['dotnet'] = {'installed': False}
+        # Collect Git, Node.js, npm, Python and .NET versions
+        for name, future in version_futures:
+            info = future.result()
+            if info is not None:
+                software[name] = info
         
         # Detect Visual Studio (using registry)
         try:
-            vs_versions = self._detect_visual_studio_versions()
+            vs_versions = vs_future.result()
             if vs_versions:
                 software['visual_studio'] = {'installed': True, 'versions': vs_versions}
             else:
@@ -232,21 +238,8 @@ class FeatureDetection:
         except Exception:
             software['visual_studio'] = {'installed': False}
         
-        # Detect VS Code (using where command)
-        try:
-            result = subprocess.run(['where', 'code'], capture_output=True, text=True, check=False)
-            if result.returncode == 0:
-                software['vscode'] = {'installed': True, 'path': result.stdout.strip()}
-                # Try to get version
-                version_result = subprocess.run(['code', '--version'], capture_output=True, text=True, check=False)
-                if version_result.returncode == 0:
-                    version_lines = version_result.stdout.strip().split('\n')
-                    if version_lines:
-                        software['vscode']['version'] = version_lines[0]
-            else:
-                software['vscode'] = {'installed': False}
-        except Exception:
-            software['vscode'] = {'installed': False}
+        # Detect VS Code
+        software['vscode'] = vscode_future.result()
         
         # Update cache
         self._update_cache(cache_key, software)
@@ -278,34 +271,25 @@ class FeatureDetection:
         
         # Get Windows version
         try:
-            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, 
-                              r'SOFTWARE\Microsoft\Windows NT\CurrentVersion') as key:
-                
-                # Get product name
-                try:
-                    value, _ = winreg.QueryValueEx(key, 'ProductName')
-                    sys_config['os_name'] = value
-                    
-                    # Extract Windows version using regex
-                    match = self.PATTERNS['registry']['windows_version'].search(value)
-                    if match:
-                        sys_config['windows_version'] = match.group(1)
-                except Exception:
-                    pass
-                
-                # Get build number
-                try:
-                    value, _ = winreg.QueryValueEx(key, 'CurrentBuildNumber')
-                    sys_config['build_number'] = value
-                except Exception:
-                    pass
+            values = self._read_values(winreg.HKEY_LOCAL_MACHINE, r'SOFTWARE\Microsoft\Windows NT\CurrentVersion')
+            
+            # Get product name
+            if 'ProductName' in values:
+                value = values['ProductName']
+                sys_config['os_name'] = value
                 
-                # Get display version (like 21H2)
-                try:
-                    value, _ = winreg.QueryValueEx(key, 'DisplayVersion')
-                    sys_config['display_version'] = value
-                except Exception:
-                    pass
+                # Extract Windows version using regex
+                match = _PAT_WINDOWS_VERSION.search(value)
+                if match:
+                    sys_config['windows_version'] = match.group(1)
+            
+            # Get build number
+            if 'CurrentBuildNumber' in values:
+                sys_config['build_number'] = values['CurrentBuildNumber']
+            
+            # Get display version (like 21H2)
+            if 'DisplayVersion' in values:
+                sys_config['display_version'] = values['DisplayVersion']
         except Exception as e:
             self.logger.error(f"Error getting Windows version: {str(e)}")
         
@@ -366,49 +350,42 @@ class FeatureDetection:
             
             for path in office_paths:
                 try:
-                    with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, path) as key:
-                        # For ClickToRun, check ProductReleaseIds
-                        if 'ClickToRun' in path:
-                            try:
-                                value, _ = winreg.QueryValueEx(key, 'ProductReleaseIds')
-                                office_info['installed'] = True
-                                office_info['edition'] = value
-                                
-                                # Check channel
-                                try:
-                                    channel, _ = winreg.QueryValueEx(key, 'UpdateChannel')
-                                    office_info['update_channel'] = channel
-                                    
-                                    # Detect if LTSC
-                                    if 'PerpetualVL' in channel:
-                                        office_info['is_ltsc'] = True
-                                    else:
-                                        office_info['is_ltsc'] = False
-                                except Exception:
-                                    pass
-                                
-                                break
-                            except Exception:
-                                pass
-                        
-                        # For traditional Office, check InstallPath
-                        else:
-                            try:
-                                value, _ = winreg.QueryValueEx(key, 'Path')
-                                office_info['installed'] = True
-                                office_info['path'] = value
-                                
-                                # Try to determine version
-                                if '16.0' in path:
-                                    office_info['version'] = '2016'
-                                elif '15.0' in path:
-                                    office_info['version'] = '2013'
-                                elif '14.0' in path:
-                                    office_info['version'] = '2010'
+                    values = self._read_values(winreg.HKEY_LOCAL_MACHINE, path)
+                    
+                    # For ClickToRun, check ProductReleaseIds
+                    if 'ClickToRun' in path:
+                        if 'ProductReleaseIds' in values:
+                            office_info['installed'] = True
+                            office_info['edition'] = values['ProductReleaseIds']
+                            
+                            # Check channel
+                            if 'UpdateChannel' in values:
+                                channel = values['UpdateChannel']
+                                office_info['update_channel'] = channel
                                 
-                                break
-                            except Exception:
-                                pass
+                                # Detect if LTSC
+                                if 'PerpetualVL' in channel:
+                                    office_info['is_ltsc'] = True
+                                else:
+                                    office_info['is_ltsc'] = False
+                            
+                            break
+                    
+                    # For traditional Office, check InstallPath
+                    else:
+                        if 'Path' in values:
+                            office_info['installed'] = True
+                            office_info['path'] = values['Path']
+                            
+                            # Try to determine version
+                            if '16.0' in path:
+                                office_info['version'] = '2016'
+                            elif '15.0' in path:
+                                office_info['version'] = '2013'
+                            elif '14.0' in path:
+                                office_info['version'] = '2010'
+                            
+                            break
                 except Exception:
                     continue
             
@@ -417,9 +394,9 @@ class FeatureDetection:
                 # Try to determine if volume license
                 try:
                     result = subprocess.run(
-                        ['cscript', '//nologo', os.path.join(os.environ['ProgramFiles(x86)'], 
-                                                           'Microsoft Office', 'Office16', 
-                                                           'OSPP.VBS'), '/dstatus'],
+                        ['cscript', '//nologo', os.path.join(os.environ['ProgramFiles(x86)'],
+                                                             'Microsoft Office', 'Office16',
+                                                             'OSPP.VBS'), '/dstatus'],
                         capture_output=True,
                         text=True,
                         check=False
@@ -448,17 +425,37 @@ class FeatureDetection:
             force_refresh: Force a refresh of all cached data
             
         Returns:
-            Consolidated dictionary of all feature detection results
+            Consolidated dictionary of all feature detection results; a detector
+            that raises is logged and reported as an empty dictionary, so one
+            failure still leaves the other results
         """
         self.logger.info(f"Getting all features (forced={force_refresh})")
         
-        all_features = {
-            'system': self.detect_system_configuration(force_refresh),
-            'windows_features': self.detect_windows_features(force_refresh),
-            'software': self.detect_installed_software(force_refresh),
-            'office': self.detect_office_installation(force_refresh),
-            'timestamp': datetime.now().isoformat()
-        }
+        detectors = (
+            ('system', self.detect_system_configuration),
+            ('windows_features', self.detect_windows_features),
+            ('software', self.detect_installed_software),
+            ('office', self.detect_office_installation),
+        )
+        
+        # The detectors are independent and mostly wait on DISM, child processes
+        # and the registry, so run them side by side and write the cache once
+        self._defer_cache_flush = True
+        try:
+            with ThreadPoolExecutor(max_workers=len(detectors)) as executor:
+                futures = [(name, executor.submit(detect, force_refresh)) for name, detect in detectors]
+            
+            all_features = {}
+            for name, future in futures:
+                try:
+                    all_features[name] = future.result()
+                except Exception as e:
+                    self.logger.error(f"Error detecting {name}: {str(e)}")
+                    all_features[name] = {}
+            all_features['timestamp'] = datetime.now().isoformat()
+        finally:
+            self._defer_cache_flush = False
+            self.flush_cache()
         
         return all_features
     
@@ -467,6 +464,8 @@ class FeatureDetection:
         self.logger.info("Clearing feature detection cache")
         
         self.cache = {}
+        self._cache_dirty = False
+        self._last_hash = None
         
         # Remove cache file
         cache_path = os.path.join(self.CACHE_DIR, self.CACHE_FILENAME)
@@ -477,6 +476,29 @@ class FeatureDetection:
             except Exception as e:
                 self.logger.error(f"Error removing cache file: {str(e)}")
     
+    def close(self) -> None:
+        """Close registry handles kept open between detections"""
+        for key in self._key_handles.values():
+            key.Close()
+        self._key_handles.clear()
+    
+    def _open_key(self, hive: int, path: str) -> winreg.HKEYType:
+        """Open a registry key for reading, reusing the handle on later calls"""
+        key = self._key_handles.get((hive, path))
+        if key is None:
+            key = winreg.OpenKey(hive, path, 0, winreg.KEY_READ)
+            self._key_handles[(hive, path)] = key
+        return key
+    
+    def _read_values(self, hive: int, path: str) -> Dict[str, Any]:
+        """Read every value of a registry key in a single enumeration pass"""
+        key = self._open_key(hive, path)
+        values = {}
+        for index in range(winreg.QueryInfoKey(key)[1]):
+            name, data, _ = winreg.EnumValue(key, index)
+            values[name] = data
+        return values
+    
     def _ensure_cache_dir(self) -> None:
         """Ensure cache directory exists"""
         if not os.path.exists(self.CACHE_DIR):
@@ -490,63 +512,199 @@ class FeatureDetection:
         """Load cache from disk"""
         cache_path = os.path.join(self.CACHE_DIR, self.CACHE_FILENAME)
         
-        if not os.path.exists(cache_path):
+        try:
+            file_key = _cache_file_key(cache_path)
+        except OSError:
             return {}
         
+        # Reuse the parsed file when it has not changed since it was last seen;
+        # entries are replaced rather than mutated, so a shallow copy is enough
+        if _CACHE_SNAPSHOT['key'] == file_key:
+            self._last_hash = _CACHE_SNAPSHOT['hash']
+            return dict(_CACHE_SNAPSHOT['data'])
+        
         try:
-            with open(cache_path, 'r') as f:
-                return json.load(f)
+            with open(cache_path, 'rb') as f:
+                raw = f.read()
+            data = json.loads(raw)
+            self._last_hash = _content_hash(raw)
+            _CACHE_SNAPSHOT.update(key=file_key, data=data, hash=self._last_hash)
+            return dict(data)
         except Exception as e:
             self.logger.error(f"Error loading cache: {str(e)}")
             return {}
     
+    def flush_cache(self) -> None:
+        """Write pending cache updates to disk"""
+        with self._cache_lock:
+            if self._cache_dirty:
+                self._save_cache()
+    
     def _save_cache(self) -> None:
         """Save cache to disk"""
         cache_path = os.path.join(self.CACHE_DIR, self.CACHE_FILENAME)
+        temp_path = cache_path + '.tmp'
         
-        try:
-            with open(cache_path, 'w') as f:
-                json.dump(self.cache, f, indent=2)
+        # Detectors may finish on worker threads; one writer at a time
+        with self._cache_lock:
+            try:
+                # The cache is machine-read only, so skip indentation
+                buf = json.dumps(self.cache, separators=(',', ':')).encode('utf-8')
                 
-            self.logger.debug(f"Cache saved to: {cache_path}")
-        except Exception as e:
-            self.logger.error(f"Error saving cache: {str(e)}")
+                # Nothing to write when the file already holds these bytes
+                buf_hash = _content_hash(buf)
+                if buf_hash == self._last_hash:
+                    self._cache_dirty = False
+                    return
+                
+                with open(temp_path, 'wb') as f:
+                    f.write(buf)
+                    
+                # Swap the complete file in so readers never see a partial write
+                os.replace(temp_path, cache_path)
+                self._cache_dirty = False
+                self._last_hash = buf_hash
+                _CACHE_SNAPSHOT.update(key=_cache_file_key(cache_path), data=dict(self.cache), hash=buf_hash)
+                self.logger.debug(f"Cache saved to: {cache_path}")
+            except Exception as e:
+                self.logger.error(f"Error saving cache: {str(e)}")
     
     def _update_cache(self, key: str, data: Dict[str, Any]) -> None:
         """Update cache with new data"""
-        self.cache[key] = {
-            'data': data,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        # Save updated cache
-        self._save_cache()
+        with self._cache_lock:
+            self.cache[key] = {
+                'data': data,
+                'timestamp': time.time()
+            }
+            
+            # Save updated cache, unless a batch of detections is in progress
+            self._cache_dirty = True
+            if not self._defer_cache_flush:
+                self._save_cache()
     
-    def _is_cache_expired(self, timestamp_str: str) -> bool:
+    def _is_cache_expired(self, timestamp: float) -> bool:
         """Check if cache entry has expired"""
         try:
-            timestamp = datetime.fromisoformat(timestamp_str)
-            expiry = datetime.now() - timedelta(hours=self.CACHE_EXPIRY)
-            
-            return timestamp < expiry
+            # Entries written before epoch timestamps carry ISO strings
+            if isinstance(timestamp, str):
+                timestamp = datetime.fromisoformat(timestamp).timestamp()
+                
+            return time.time() - timestamp > self.CACHE_EXPIRY_SEC
         except Exception:
             # If we can't parse the timestamp, consider it expired
             return True
     
-    def _extract_feature_details(self, output: str) -> Dict[str, str]:
-        """Extract detailed feature information from DISM output"""
-        details = {}
-        lines = output.strip().split('\n')
-        
-        for line in lines:
-            if ':' in line:
-                key, value = line.split(':', 1)
-                details[key.strip()] = value.strip()
+    def get_feature_details(self, feature_name: str) -> Dict[str, str]:
+        """
+        Get the full DISM record of a single Windows feature
         
-        return details
+        Args:
+            feature_name: Feature name as reported by detect_windows_features
+            
+        Returns:
+            Dictionary of the fields DISM reports for the feature
+        """
+        if feature_name not in self._feature_details:
+            self._feature_details[feature_name] = self._get_feature_details(feature_name)
+        return self._feature_details[feature_name]
+    
+    def _get_feature_details(self, feature_name: str) -> Dict[str, str]:
+        """Get the details of a single Windows feature"""
+        detail_result = subprocess.run(
+            ['dism', '/online', '/get-featureinfo', f'/featurename:{feature_name}'],
+            capture_output=True,
+            check=False
+        )
+        
+        if detail_result.returncode != 0:
+            return {}
+            
+        return self._extract_feature_details(detail_result.stdout)
+    
+    def _extract_feature_details(self, output: bytes) -> Dict[str, str]:
+        """Extract detailed feature information from DISM output"""
+        return {
+            key.decode(_DISM_ENCODING, 'replace'): value.decode(_DISM_ENCODING, 'replace')
+            for key, value in _KV_RE.findall(output)
+        }
+    
+    def _find_tool(self, name: str) -> Optional[str]:
+        """Locate an executable on PATH, remembering the result for this session"""
+        if name not in self._tool_paths:
+            self._tool_paths[name] = shutil.which(name)
+        return self._tool_paths[name]
+    
+    def _probe_version(self, command: Tuple[str, ...], pattern: re.Pattern) -> Optional[Dict[str, Any]]:
+        """Run a tool's version command and parse the reported version"""
+        # Skip the process entirely when the tool is not on PATH
+        tool_path = self._find_tool(command[0])
+        if tool_path is None:
+            return {'installed': False}
+            
+        try:
+            result = subprocess.run([tool_path, *command[1:]], capture_output=True, check=False)
+            if result.returncode == 0:
+                match = pattern.search(result.stdout.strip())
+                if match:
+                    return {'installed': True, 'version': match.group(1).decode('utf-8', 'replace')}
+            return None
+        except Exception:
+            return {'installed': False}
+    
+    def _detect_vscode(self) -> Dict[str, Any]:
+        """Detect VS Code and its version"""
+        try:
+            code_path = self._find_tool('code')
+            if code_path is None:
+                return {'installed': False}
+                
+            vscode = {'installed': True, 'path': code_path}
+            
+            # Try to get version
+            version_result = subprocess.run([code_path, '--version'], capture_output=True, check=False)
+            if version_result.returncode == 0:
+                # The first line holds the version; commit and architecture follow
+                version_line = version_result.stdout.strip().partition(b'\n')[0]
+                vscode['version'] = version_line.strip().decode('utf-8', 'replace')
+            return vscode
+        except Exception:
+            return {'installed': False}
     
     def _detect_visual_studio_versions(self) -> List[Dict[str, str]]:
         """Detect installed Visual Studio versions"""
+        # The installer's own catalogue answers in one call where available
+        vs_versions = self._query_vswhere()
+        if vs_versions is not None:
+            return vs_versions
+            
+        return self._probe_visual_studio_dirs()
+    
+    def _query_vswhere(self) -> Optional[List[Dict[str, str]]]:
+        """List Visual Studio installations with vswhere, or None if it is unavailable"""
+        vswhere = os.path.join(os.environ.get('ProgramFiles(x86)', r'C:\Program Files (x86)'),
+                               'Microsoft Visual Studio', 'Installer', 'vswhere.exe')
+        try:
+            result = subprocess.run([vswhere, '-format', 'json', '-utf8'], capture_output=True, check=False)
+            if result.returncode != 0:
+                return None
+                
+            # vswhere may print nothing at all when no instance is installed
+            if not result.stdout.strip():
+                return []
+                
+            return [
+                {
+                    'year': instance['catalog']['productLineVersion'],
+                    'edition': instance['productId'].rsplit('.', 1)[-1],
+                    'path': instance['installationPath']
+                }
+                for instance in json.loads(result.stdout)
+            ]
+        except Exception:
+            return None
+    
+    def _probe_visual_studio_dirs(self) -> List[Dict[str, str]]:
+        """Find Visual Studio installations by probing the default install folders"""
         vs_versions = []
         
         try:
@@ -591,10 +749,10 @@ class FeatureDetection:
     def _is_dev_mode_enabled(self) -> bool:
         """Check if Windows Developer Mode is enabled"""
         try:
-            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, 
-                              r'SOFTWARE\Microsoft\Windows\CurrentVersion\AppModelUnlock') as key:
-                value, _ = winreg.QueryValueEx(key, 'AllowDevelopmentWithoutDevLicense')
-                return value == 1
+            key = self._open_key(winreg.HKEY_LOCAL_MACHINE,
+                                 r'SOFTWARE\Microsoft\Windows\CurrentVersion\AppModelUnlock')
+            value, _ = winreg.QueryValueEx(key, 'AllowDevelopmentWithoutDevLicense')
+            return value == 1
         except Exception:
             return False
     
@@ -603,52 +761,54 @@ class FeatureDetection:
         info = {}
         
         try:
-            # Use WMI to get system information
-            import wmi
-            c = wmi.WMI()
+            # psutil, platform and the registry answer directly, without
+            # starting a WMI provider
+            import psutil
+            
+            os_bits = 64 if platform.machine().endswith('64') else 32
             
             # Get CPU info
-            for cpu in c.Win32_Processor():
-                info['cpu'] = {
-                    'name': cpu.Name,
-                    'cores': cpu.NumberOfCores,
-                    'logical_processors': cpu.NumberOfLogicalProcessors,
-                    'architecture': cpu.AddressWidth,  # 32 or 64 bit
-                    'max_clock': cpu.MaxClockSpeed
-                }
-                break  # Just get the first CPU
+            cpu_values = self._read_values(winreg.HKEY_LOCAL_MACHINE,
+                                           r'HARDWARE\DESCRIPTION\System\CentralProcessor\0')
+            info['cpu'] = {
+                'name': cpu_values['ProcessorNameString'].strip(),
+                'cores': psutil.cpu_count(logical=False),
+                'logical_processors': psutil.cpu_count(logical=True),
+                'architecture': os_bits,  # 32 or 64 bit
+                'max_clock': cpu_values['~MHz']
+            }
             
             # Get memory info
-            for mem in c.Win32_ComputerSystem():
-                total_ram_gb = round(int(mem.TotalPhysicalMemory) / (1024**3), 2)
-                info['ram'] = {
-                    'total_gb': total_ram_gb
-                }
-                break
+            total_ram_gb = round(psutil.virtual_memory().total / (1024**3), 2)
+            info['ram'] = {
+                'total_gb': total_ram_gb
+            }
             
             # Get disk info
             drives = []
-            for disk in c.Win32_LogicalDisk(DriveType=3):  # Type 3 = Local Disk
+            for partition in psutil.disk_partitions():
+                if 'fixed' not in partition.opts:
+                    continue
+                usage = psutil.disk_usage(partition.mountpoint)
                 drives.append({
-                    'drive': disk.DeviceID,
-                    'volume_name': disk.VolumeName,
-                    'size_gb': round(int(disk.Size) / (1024**3), 2),
-                    'free_gb': round(int(disk.FreeSpace) / (1024**3), 2)
+                    'drive': partition.device.rstrip('\\'),
+                    'volume_name': _volume_label(partition.mountpoint),
+                    'size_gb': round(usage.total / (1024**3), 2),
+                    'free_gb': round(usage.free / (1024**3), 2)
                 })
             info['drives'] = drives
             
             # Get operating system info
-            for os in c.Win32_OperatingSystem():
-                info['os'] = {
-                    'name': os.Caption,
-                    'version': os.Version,
-                    'build': os.BuildNumber,
-                    'architecture': os.OSArchitecture
-                }
-                break
+            os_values = self._read_values(winreg.HKEY_LOCAL_MACHINE, r'SOFTWARE\Microsoft\Windows NT\CurrentVersion')
+            info['os'] = {
+                'name': os_values['ProductName'],
+                'version': platform.version(),
+                'build': os_values['CurrentBuildNumber'],
+                'architecture': f"{os_bits}-bit"
+            }
             
             return info
             
         except Exception as e:
             self.logger.error(f"Error getting system info: {str(e)}")
-            return {}
\ No newline at end of file
+            return {}
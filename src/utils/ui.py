@@ -4,10 +4,41 @@ TUI Manager Module
 This module handles the text-based user interface for the Windows Developer Utilities Toolkit.
 """
 import os
+import re
 import sys
 import time
+import functools
 from typing import List, Any, Optional, Callable
 
+# Color and style escape sequences, which take up no space on screen
+_ANSI_RE = re.compile(r'\033\[[0-9;]*m')
+
+# Deletes the whitespace users type around comma-separated choices
+_WS_TABLE = str.maketrans('', '', ' \t')
+
+# Menu numbers users can type, looked up before falling back to int()
+_MENU_NUMBERS = {str(i): i for i in range(1, 100)}
+
+
+def _parse_choice(text: str) -> int:
+    """Parse a typed menu number, raising ValueError if it is not a number"""
+    number = _MENU_NUMBERS.get(text.strip())
+    return number if number is not None else int(text)
+
+
+def _visible_len(text: str) -> int:
+    """Length of a string as displayed, ignoring ANSI escape sequences"""
+    return len(_ANSI_RE.sub('', text))
+
+
+@functools.lru_cache(maxsize=1)
+def _enable_vt_mode() -> bool:
+    """Switch the Windows console to ANSI processing, once per process"""
+    import ctypes
+    kernel32 = ctypes.windll.kernel32
+    return bool(kernel32.SetConsoleMode(kernel32.GetStdHandle(-11), 7))
+
+
 class TUIManager:
     """
     Text-based User Interface manager for the Windows Developer Utilities Toolkit.
@@ -37,52 +68,134 @@ class TUIManager:
         "BG_WHITE": "\033[47m",
     }
     
+    # Erase the screen and scrollback, then home the cursor
+    CLEAR_SCREEN = "\033[2J\033[3J\033[H"
+    
+    # Number of cells in the progress bar
+    PROGRESS_BAR_LENGTH = 50
+    
+    # Main menu entries as (module key, label)
+    MAIN_MENU_OPTIONS = (
+        ("environment", "Development Environment Setup"),
+        ("office", "Office LTSC Management"),
+        ("windows", "Windows Configuration"),
+        ("exit", "Exit")
+    )
+    
     def __init__(self):
         """Initialize the TUI manager"""
+        self._is_windows = os.name == 'nt'
         self._setup_console()
         self.width = 80  # Default width
+        self._main_menu_body = None  # Rendered on first display
+        self._welcome_block = None  # Rendered and encoded on first display
+        self._goodbye_block = None  # Rendered and encoded on first display
+        
+        # Color-wrapped prefixes and separator bars never change, so build them once
+        colors = self.COLORS
+        self._reset = colors['RESET']
+        self._header_style = colors['BOLD'] + colors['CYAN']
+        self._header_bar = f"{self._header_style}{'=' * self.width}{self._reset}"
+        self._info_prefix = f"{colors['CYAN']}[INFO] "
+        self._success_prefix = f"{colors['GREEN']}[SUCCESS] "
+        self._warning_prefix = f"{colors['YELLOW']}[WARNING] "
+        self._error_prefix = f"{colors['RED']}[ERROR] "
+        self._progress_prefix = f"{colors['MAGENTA']}[PROGRESS] "
+        
+        # Row templates for menus and choice prompts, filled with (number, label)
+        self._menu_row = f"{colors['BOLD']}{colors['YELLOW']}[{{}}]{self._reset} {{}}"
+        self._choice_row = f"{colors['YELLOW']}    [{{}}] {{}}{self._reset}"
+        
+        # Prompt templates, filled with the message (and default value)
+        self._confirm_fmt = f"{colors['YELLOW']}[CONFIRM] {{}} (y/n): {self._reset}"
+        self._input_fmt = f"{colors['GREEN']}[INPUT] {{}}: {self._reset}"
+        self._input_default_fmt = f"{colors['GREEN']}[INPUT] {{}} [{{}}]: {self._reset}"
+        
+        # Every progress bar is a 50-cell window into this strip
+        self._full_bar = '█' * self.PROGRESS_BAR_LENGTH + '░' * self.PROGRESS_BAR_LENGTH
+        self._progress_fmt = f"\r{colors['MAGENTA']}Progress: |{{}}| {{:.1f}}%{self._reset}"
+        self._last_progress_frame = None
+        self._last_filled = -1
         
     def _setup_console(self):
         """Set up the console for ANSI colors"""
         # Enable ANSI colors on Windows
-        if os.name == 'nt':
-            import ctypes
-            kernel32 = ctypes.windll.kernel32
-            kernel32.SetConsoleMode(kernel32.GetStdHandle(-11), 7)
+        if self._is_windows:
+            _enable_vt_mode()
             
     def _clear_screen(self):
         """Clear the console screen"""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        # The console understands ANSI sequences, so no cls/clear process is needed
+        sys.stdout.write(self.CLEAR_SCREEN)
+        
+    def _format_header(self, title: str) -> str:
+        """Build a styled header block"""
+        bar = self._header_bar
+        return f"\n{bar}\n{self._header_style}{title.center(self.width)}{self._reset}\n{bar}\n"
+        
+    def _format_footer(self) -> str:
+        """Build a styled footer block"""
+        return f"\n{self._header_bar}\n"
         
     def _print_header(self, title: str):
         """Print a styled header"""
-        print(f"\n{self.COLORS['BOLD']}{self.COLORS['CYAN']}{'=' * self.width}{self.COLORS['RESET']}")
-        print(f"{self.COLORS['BOLD']}{self.COLORS['CYAN']}{title.center(self.width)}{self.COLORS['RESET']}")
-        print(f"{self.COLORS['BOLD']}{self.COLORS['CYAN']}{'=' * self.width}{self.COLORS['RESET']}\n")
+        print(self._format_header(title))
         
     def _print_footer(self):
         """Print a styled footer"""
-        print(f"\n{self.COLORS['BOLD']}{self.COLORS['CYAN']}{'=' * self.width}{self.COLORS['RESET']}\n")
+        print(self._format_footer())
+        
+    def _print_menu(self, title: str, body: str):
+        """Print header, option rows and footer of a menu in a single write"""
+        print(f"{self._format_header(title)}\n{body}\n{self._format_footer()}")
+        
+    def _format_choices(self, options: List[str]) -> str:
+        """Build the numbered option rows of a choice prompt"""
+        return "\n".join(self._choice_row.format(i + 1, option) for i, option in enumerate(options))
+        
+    def _center_block(self, lines: List[str]) -> str:
+        """Center lines by their visible width and pad the block with blank lines"""
+        body = "\n".join(
+            ' ' * max((self.width - _visible_len(line)) // 2, 0) + line
+            for line in lines
+        )
+        return f"\n\n\n{body}\n\n\n"
+        
+    def _write_static(self, data: bytes):
+        """Write pre-encoded screen content straight to the underlying byte stream"""
+        stream = sys.stdout
+        
+        # Only the interpreter's own stdout is known to pass bytes through as-is;
+        # replaced or wrapped streams, such as test captures or colorama, take text
+        buffer = getattr(stream, 'buffer', None) if stream is sys.__stdout__ else None
+        if buffer is None:
+            stream.write(data.decode('utf-8'))
+            return
+            
+        # Text already queued, like the clear-screen sequence, has to go out first
+        stream.flush()
+        buffer.write(data)
+        buffer.flush()
         
     def display_welcome(self):
         """Display welcome screen"""
         self._clear_screen()
         
-        welcome_text = [
-            f"{self.COLORS['BOLD']}{self.COLORS['GREEN']}Windows Developer Utilities Toolkit{self.COLORS['RESET']}",
-            f"{self.COLORS['CYAN']}A comprehensive utility suite for Windows developers{self.COLORS['RESET']}",
-            "",
-            f"{self.COLORS['YELLOW']}Version: 1.0.0{self.COLORS['RESET']}",
-            f"{self.COLORS['YELLOW']}Copyright (c) 2025 - Your Development Team{self.COLORS['RESET']}",
-            "",
-            f"{self.COLORS['RED']}IMPORTANT: This toolkit requires administrator privileges{self.COLORS['RESET']}",
-            f"{self.COLORS['RED']}It should only be used for legitimate development purposes{self.COLORS['RESET']}",
-        ]
-        
-        print("\n" * 2)
-        for line in welcome_text:
-            print(line.center(self.width))
-        print("\n" * 2)
+        # The screen never changes, so center and encode it only once
+        if self._welcome_block is None:
+            welcome_text = [
+                f"{self.COLORS['BOLD']}{self.COLORS['GREEN']}Windows Developer Utilities Toolkit{self.COLORS['RESET']}",
+                f"{self.COLORS['CYAN']}A comprehensive utility suite for Windows developers{self.COLORS['RESET']}",
+                "",
+                f"{self.COLORS['YELLOW']}Version: 1.0.0{self.COLORS['RESET']}",
+                f"{self.COLORS['YELLOW']}Copyright (c) 2025 - Your Development Team{self.COLORS['RESET']}",
+                "",
+                f"{self.COLORS['RED']}IMPORTANT: This toolkit requires administrator privileges{self.COLORS['RESET']}",
+                f"{self.COLORS['RED']}It should only be used for legitimate development purposes{self.COLORS['RESET']}",
+            ]
+            self._welcome_block = (self._center_block(welcome_text) + "\n").encode('utf-8')
+        
+        self._write_static(self._welcome_block)
         
         input(f"{self.COLORS['GREEN']}Press Enter to continue...{self.COLORS['RESET']}")
         
@@ -90,41 +203,37 @@ class TUIManager:
         """Display goodbye message"""
         self._clear_screen()
         
-        goodbye_text = [
-            f"{self.COLORS['BOLD']}{self.COLORS['GREEN']}Thank you for using Windows Developer Utilities Toolkit{self.COLORS['RESET']}",
-            "",
-            f"{self.COLORS['CYAN']}All operations completed{self.COLORS['RESET']}",
-            f"{self.COLORS['CYAN']}Temporary files have been cleaned up{self.COLORS['RESET']}",
-            "",
-            f"{self.COLORS['YELLOW']}Have a productive day!{self.COLORS['RESET']}",
-        ]
+        # The screen never changes, so center and encode it only once
+        if self._goodbye_block is None:
+            goodbye_text = [
+                f"{self.COLORS['BOLD']}{self.COLORS['GREEN']}Thank you for using Windows Developer Utilities Toolkit{self.COLORS['RESET']}",
+                "",
+                f"{self.COLORS['CYAN']}All operations completed{self.COLORS['RESET']}",
+                f"{self.COLORS['CYAN']}Temporary files have been cleaned up{self.COLORS['RESET']}",
+                "",
+                f"{self.COLORS['YELLOW']}Have a productive day!{self.COLORS['RESET']}",
+            ]
+            self._goodbye_block = (self._center_block(goodbye_text) + "\n").encode('utf-8')
         
-        print("\n" * 2)
-        for line in goodbye_text:
-            print(line.center(self.width))
-        print("\n" * 2)
+        self._write_static(self._goodbye_block)
         
     def display_main_menu(self) -> str:
         """Display main menu and get user choice"""
-        options = [
-            ("environment", "Development Environment Setup"),
-            ("office", "Office LTSC Management"),
-            ("windows", "Windows Configuration"),
-            ("exit", "Exit")
-        ]
+        options = self.MAIN_MENU_OPTIONS
         
-        self._clear_screen()
-        self._print_header("MAIN MENU")
+        # The main menu never changes, so render the option list only once
+        if self._main_menu_body is None:
+            self._main_menu_body = "\n".join(
+                self._menu_row.format(i + 1, label) for i, (key, label) in enumerate(options)
+            )
         
-        for i, (key, label) in enumerate(options):
-            print(f"{self.COLORS['BOLD']}{self.COLORS['YELLOW']}[{i+1}]{self.COLORS['RESET']} {label}")
-            
-        self._print_footer()
+        self._clear_screen()
+        self._print_menu("MAIN MENU", self._main_menu_body)
         
         while True:
             try:
                 choice = input(f"{self.COLORS['GREEN']}Enter your choice (1-{len(options)}): {self.COLORS['RESET']}")
-                choice_idx = int(choice) - 1
+                choice_idx = _parse_choice(choice) - 1
                 
                 if 0 <= choice_idx < len(options):
                     return options[choice_idx][0]
@@ -137,17 +246,14 @@ class TUIManager:
     def display_menu(self, title: str, options: List[str]) -> int:
         """Display a menu with options and return the selected index"""
         self._clear_screen()
-        self._print_header(title)
-        
-        for i, option in enumerate(options):
-            print(f"{self.COLORS['BOLD']}{self.COLORS['YELLOW']}[{i+1}]{self.COLORS['RESET']} {option}")
-            
-        self._print_footer()
+        self._print_menu(title, "\n".join(
+            self._menu_row.format(i + 1, option) for i, option in enumerate(options)
+        ))
         
         while True:
             try:
                 choice = input(f"{self.COLORS['GREEN']}Enter your choice (1-{len(options)}): {self.COLORS['RESET']}")
-                choice_idx = int(choice) - 1
+                choice_idx = _parse_choice(choice) - 1
                 
                 if 0 <= choice_idx < len(options):
                     return choice_idx
@@ -159,60 +265,71 @@ class TUIManager:
                 
     def display_info(self, message: str):
         """Display an informational message"""
-        print(f"{self.COLORS['CYAN']}[INFO] {message}{self.COLORS['RESET']}")
+        print(f"{self._info_prefix}{message}{self._reset}")
         
     def display_success(self, message: str):
         """Display a success message"""
-        print(f"{self.COLORS['GREEN']}[SUCCESS] {message}{self.COLORS['RESET']}")
+        print(f"{self._success_prefix}{message}{self._reset}")
         
     def display_warning(self, message: str):
         """Display a warning message"""
-        print(f"{self.COLORS['YELLOW']}[WARNING] {message}{self.COLORS['RESET']}")
+        print(f"{self._warning_prefix}{message}{self._reset}")
         
     def display_error(self, message: str):
         """Display an error message"""
-        print(f"{self.COLORS['RED']}[ERROR] {message}{self.COLORS['RESET']}")
+        print(f"{self._error_prefix}{message}{self._reset}")
         
     def display_progress(self, message: str):
         """Display a progress message"""
-        print(f"{self.COLORS['MAGENTA']}[PROGRESS] {message}{self.COLORS['RESET']}")
+        print(f"{self._progress_prefix}{message}{self._reset}")
         
     def update_progress(self, percentage: float):
         """Update a progress bar"""
-        bar_length = 50
-        filled_length = int(bar_length * percentage / 100)
-        bar = '█' * filled_length + '░' * (bar_length - filled_length)
+        bar_length = self.PROGRESS_BAR_LENGTH
+        filled_length = min(max(int(bar_length * percentage / 100), 0), bar_length)
+        bar = self._full_bar[bar_length - filled_length:2 * bar_length - filled_length]
+        
+        # Redrawing an identical frame changes nothing on screen
+        frame = self._progress_fmt.format(bar, percentage)
+        if frame == self._last_progress_frame:
+            return
+        self._last_progress_frame = frame
         
-        print(f"\r{self.COLORS['MAGENTA']}Progress: |{bar}| {percentage:.1f}%{self.COLORS['RESET']}", end='')
+        sys.stdout.write(frame)
         if percentage >= 100:
-            print()
+            # Finish the line and start the next bar from scratch
+            sys.stdout.write('\n')
+            sys.stdout.flush()
+            self._last_progress_frame = None
+            self._last_filled = -1
+        elif filled_length != self._last_filled:
+            # Only push the frame out when a cell of the bar changed
+            sys.stdout.flush()
+            self._last_filled = filled_length
             
     def confirm(self, message: str) -> bool:
         """Ask for user confirmation"""
-        response = input(f"{self.COLORS['YELLOW']}[CONFIRM] {message} (y/n): {self.COLORS['RESET']}")
-        return response.lower().startswith('y')
+        response = input(self._confirm_fmt.format(message))
+        return response[:1] in ('y', 'Y')
         
     def prompt_input(self, message: str, default: str = "") -> str:
         """Prompt user for text input"""
         if default:
-            prompt = f"{self.COLORS['GREEN']}[INPUT] {message} [{default}]: {self.COLORS['RESET']}"
+            prompt = self._input_default_fmt.format(message, default)
         else:
-            prompt = f"{self.COLORS['GREEN']}[INPUT] {message}: {self.COLORS['RESET']}"
+            prompt = self._input_fmt.format(message)
             
         response = input(prompt)
         return response if response else default
         
     def prompt_choice(self, message: str, options: List[str]) -> int:
         """Prompt user to choose from a list of options"""
-        print(f"{self.COLORS['GREEN']}[CHOICE] {message}{self.COLORS['RESET']}")
-        
-        for i, option in enumerate(options):
-            print(f"{self.COLORS['YELLOW']}    [{i+1}] {option}{self.COLORS['RESET']}")
+        print(f"{self.COLORS['GREEN']}[CHOICE] {message}{self.COLORS['RESET']}\n{self._format_choices(options)}")
             
         while True:
             try:
                 choice = input(f"{self.COLORS['GREEN']}Enter choice (1-{len(options)}): {self.COLORS['RESET']}")
-                choice_idx = int(choice) - 1
+                choice_idx = _parse_choice(choice) - 1
                 
                 if 0 <= choice_idx < len(options):
                     return choice_idx
@@ -224,22 +341,23 @@ class TUIManager:
                 
     def prompt_multichoice(self, message: str, options: List[str]) -> List[int]:
         """Prompt user to choose multiple options from a list"""
-        print(f"{self.COLORS['GREEN']}[MULTI-CHOICE] {message}{self.COLORS['RESET']}")
-        print(f"{self.COLORS['CYAN']}(Enter comma-separated numbers, e.g., 1,3,4){self.COLORS['RESET']}")
-        
-        for i, option in enumerate(options):
-            print(f"{self.COLORS['YELLOW']}    [{i+1}] {option}{self.COLORS['RESET']}")
+        print(
+            f"{self.COLORS['GREEN']}[MULTI-CHOICE] {message}{self.COLORS['RESET']}\n"
+            f"{self.COLORS['CYAN']}(Enter comma-separated numbers, e.g., 1,3,4){self.COLORS['RESET']}\n"
+            f"{self._format_choices(options)}"
+        )
             
         while True:
             try:
                 choices = input(f"{self.COLORS['GREEN']}Enter choices (1-{len(options)}): {self.COLORS['RESET']}")
                 
-                if not choices.strip():
+                choices = choices.translate(_WS_TABLE)
+                if not choices:
                     return []
                     
-                choice_indices = [int(x.strip()) - 1 for x in choices.split(',')]
+                choice_indices = [int(x) - 1 for x in choices.split(',')]
                 
-                if all(0 <= idx < len(options) for idx in choice_indices):
+                if min(choice_indices) >= 0 and max(choice_indices) < len(options):
                     return choice_indices
                     
                 print(f"{self.COLORS['RED']}Invalid choices. Please try again.{self.COLORS['RESET']}")
@@ -0,0 +1,20 @@
+"""
+Shared pytest configuration for the test suite.
+"""
+import sys
+from pathlib import Path
+
+# Make the repository root importable once for the whole session
+_ROOT = str(Path(__file__).resolve().parent.parent)
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+
+def assert_ui(mock_ui, **counts):
+    """Assert how many times each UI method was called, in a single pass."""
+    mismatches = {
+        name: getattr(mock_ui, name).call_count
+        for name, expected in counts.items()
+        if getattr(mock_ui, name).call_count != expected
+    }
+    assert not mismatches, f"Unexpected UI call counts {mismatches}, expected {counts}"
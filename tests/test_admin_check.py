@@ -3,10 +3,6 @@ Tests for the admin_check utility module.
 """
 import unittest
 from unittest.mock import patch
-import sys
-
-# Add local path to import modules
-sys.path.append('.')
 
 from windows_dev_toolkit.utils.admin_check import verify_admin_privileges
 
@@ -14,44 +10,73 @@ from windows_dev_toolkit.utils.admin_check import verify_admin_privileges
 class TestAdminCheck(unittest.TestCase):
     """Test cases for admin check functionality."""
 
-    @patch('ctypes.windll.shell32.IsUserAnAdmin')
-    def test_admin_check_admin(self, mock_is_admin):
+    @classmethod
+    def setUpClass(cls):
+        """Patch the Windows API once for the whole test case."""
+        # Replace ctypes.windll (created where it does not exist) so every test
+        # shares one IsUserAnAdmin mock
+        cls._windll_patcher = patch('ctypes.windll', create=True)
+        cls.mock_is_admin = cls._windll_patcher.start().shell32.IsUserAnAdmin
+
+    @classmethod
+    def tearDownClass(cls):
+        """Restore the Windows API."""
+        cls._windll_patcher.stop()
+
+    def setUp(self):
+        """Set up test fixtures."""
+        # Each test needs a fresh check rather than the cached result
+        verify_admin_privileges.cache_clear()
+        
+        # Forget calls and behaviour configured by earlier tests
+        self.mock_is_admin.reset_mock(return_value=True, side_effect=True)
+
+    def test_admin_check_admin(self):
         """Test admin check when running as admin."""
         # Mock the IsUserAnAdmin function to return True (admin)
-        mock_is_admin.return_value = 1
+        self.mock_is_admin.return_value = 1
         
         # Test the function
         result = verify_admin_privileges()
         
         # Verify the result
         self.assertTrue(result)
-        mock_is_admin.assert_called_once()
+        self.mock_is_admin.assert_called_once()
 
-    @patch('ctypes.windll.shell32.IsUserAnAdmin')
-    def test_admin_check_non_admin(self, mock_is_admin):
+    def test_admin_check_non_admin(self):
         """Test admin check when not running as admin."""
         # Mock the IsUserAnAdmin function to return False (not admin)
-        mock_is_admin.return_value = 0
+        self.mock_is_admin.return_value = 0
         
         # Test the function
         result = verify_admin_privileges()
         
         # Verify the result
         self.assertFalse(result)
-        mock_is_admin.assert_called_once()
+        self.mock_is_admin.assert_called_once()
 
-    @patch('ctypes.windll.shell32.IsUserAnAdmin')
-    def test_admin_check_exception(self, mock_is_admin):
+    def test_admin_check_exception(self):
         """Test admin check when an exception occurs."""
         # Mock the IsUserAnAdmin function to raise an exception
-        mock_is_admin.side_effect = Exception("Test exception")
+        self.mock_is_admin.side_effect = Exception("Test exception")
         
         # Test the function
         result = verify_admin_privileges()
         
         # The function should return False when an exception occurs
         self.assertFalse(result)
-        mock_is_admin.assert_called_once()
+        self.mock_is_admin.assert_called_once()
+
+    def test_admin_check_cached(self):
+        """Test that the admin status is only queried once."""
+        self.mock_is_admin.return_value = 1
+        
+        # Check twice
+        self.assertTrue(verify_admin_privileges())
+        self.assertTrue(verify_admin_privileges())
+        
+        # The Windows API should only be called the first time
+        self.mock_is_admin.assert_called_once()
 
     @patch('os.name', 'posix')
     def test_admin_check_non_windows(self):
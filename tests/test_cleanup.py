@@ -4,35 +4,26 @@ Tests for the cleanup utility module.
 import unittest
 from unittest.mock import patch, mock_open, MagicMock
 import os
-import sys
 import tempfile
-import shutil
 
-# Add local path to import modules
-sys.path.append('.')
+from pyfakefs.fake_filesystem_unittest import TestCase
 
-from windows_dev_toolkit.utils.cleanup import CleanupManager
+from windows_dev_toolkit.utils.cleanup import CleanupManager, _ROOT_KEY_MAP
 
 
-class TestCleanupManager(unittest.TestCase):
+class TestCleanupManager(TestCase):
     """Test cases for cleanup manager functionality."""
 
     def setUp(self):
         """Set up test fixtures."""
+        # Run every test against an in-memory file system
+        self.setUpPyfakefs()
         self.cleanup_manager = CleanupManager()
         
-        # Create temporary test directories and files
+        # Create a temporary directory holding the test file
         self.test_dir = tempfile.mkdtemp()
-        self.test_file = tempfile.NamedTemporaryFile(delete=False)
-        self.test_file.close()
-
-    def tearDown(self):
-        """Tear down test fixtures."""
-        # Clean up any remaining test files/directories
-        if os.path.exists(self.test_dir):
-            shutil.rmtree(self.test_dir)
-        if os.path.exists(self.test_file.name):
-            os.unlink(self.test_file.name)
+        self.test_file = os.path.join(self.test_dir, "test.tmp")
+        self.fs.create_file(self.test_file)
 
     def test_add_temp_dir(self):
         """Test adding a temp directory to cleanup list."""
@@ -45,25 +36,104 @@ class TestCleanupManager(unittest.TestCase):
     def test_add_temp_file(self):
         """Test adding a temp file to cleanup list."""
         # Add the temp file
-        self.cleanup_manager.add_temp_file(self.test_file.name)
+        self.cleanup_manager.add_temp_file(self.test_file)
         
         # Verify it was added to the list
-        self.assertIn(self.test_file.name, self.cleanup_manager.temp_files)
+        self.assertIn(self.test_file, self.cleanup_manager.temp_files)
+
+    def test_add_temp_dir_outside_temp_root(self):
+        """Test directories outside the temp directory are not registered."""
+        # Add the home directory
+        home_dir = os.path.expanduser("~")
+        self.fs.create_dir(home_dir)
+        self.cleanup_manager.add_temp_dir(home_dir)
+        
+        # Verify it was rejected
+        self.assertEqual(len(self.cleanup_manager.temp_dirs), 0)
+
+    def test_add_temp_file_deduplicates(self):
+        """Test registering the same temp file twice keeps one entry."""
+        # Add the temp file twice
+        self.cleanup_manager.add_temp_file(self.test_file)
+        self.cleanup_manager.add_temp_file(self.test_file)
+        
+        # Verify it was only registered once
+        self.assertEqual(len(self.cleanup_manager.temp_files), 1)
 
     def test_run_cleanup_files(self):
         """Test running cleanup for files."""
         # Add the temp file
-        self.cleanup_manager.add_temp_file(self.test_file.name)
+        self.cleanup_manager.add_temp_file(self.test_file)
         
         # Run cleanup
         self.cleanup_manager.run()
         
         # Verify the file was removed
-        self.assertFalse(os.path.exists(self.test_file.name))
+        self.assertFalse(os.path.exists(self.test_file))
         
         # Verify the list was cleared
         self.assertEqual(len(self.cleanup_manager.temp_files), 0)
 
+    def test_run_logs_summary(self):
+        """Test running cleanup logs one summary line."""
+        # Add the temp file and directory
+        self.cleanup_manager.add_temp_file(self.test_file)
+        self.cleanup_manager.add_temp_dir(self.test_dir)
+        
+        # Run cleanup while capturing info logs
+        with self.assertLogs("cleanup", level="INFO") as logs:
+            self.cleanup_manager.run()
+        
+        # Verify only the summary was logged
+        self.assertEqual(logs.output, ["INFO:cleanup:Cleanup: removed 1 files, 1 dirs, 0 errors"])
+
+    def test_run_cleanup_non_critical_file(self):
+        """Test running cleanup for a file that is not needed at exit."""
+        # Add the temp file as non-critical
+        self.cleanup_manager.add_temp_file(self.test_file, critical=False)
+        
+        # Verify it is not part of the exit-time list
+        self.assertNotIn(self.test_file, self.cleanup_manager.temp_files)
+        
+        # Run cleanup
+        self.cleanup_manager.run()
+        
+        # Verify the file was still removed
+        self.assertFalse(os.path.exists(self.test_file))
+
+    def test_run_cleanup_missing_non_critical_dir(self):
+        """Test cleanup completes when a non-critical directory is already gone."""
+        # Add the temp directory as non-critical, then delete it
+        self.cleanup_manager.add_temp_dir(self.test_dir, critical=False)
+        self.fs.remove_object(self.test_dir)
+        
+        # Run cleanup while capturing info logs
+        with self.assertLogs("cleanup", level="INFO") as logs:
+            self.cleanup_manager.run()
+        
+        # Verify the run finished and cleared its registrations
+        self.assertEqual(logs.output, ["INFO:cleanup:Cleanup: removed 0 files, 0 dirs, 0 errors"])
+        self.assertEqual(len(self.cleanup_manager._finalizers), 0)
+
+    def test_run_cleanup_twice(self):
+        """Test a second cleanup run only handles newly added items."""
+        # Run cleanup once with nothing registered
+        self.cleanup_manager.run()
+        
+        # Run again without new items
+        with patch.object(self.cleanup_manager.logger, 'info') as mock_info:
+            self.cleanup_manager.run()
+            
+        # Verify the second run did nothing
+        mock_info.assert_not_called()
+        
+        # Add the temp file and run again
+        self.cleanup_manager.add_temp_file(self.test_file)
+        self.cleanup_manager.run()
+        
+        # Verify the file was removed
+        self.assertFalse(os.path.exists(self.test_file))
+
     def test_run_cleanup_directories(self):
         """Test running cleanup for directories."""
         # Add the temp directory
@@ -78,22 +148,56 @@ class TestCleanupManager(unittest.TestCase):
         # Verify the list was cleared
         self.assertEqual(len(self.cleanup_manager.temp_dirs), 0)
 
-    @patch('os.remove')
-    def test_cleanup_file_exception(self, mock_remove):
+    def test_fast_rmtree_keeps_symlink_targets(self):
+        """Test removing a tree deletes links inside it but not their targets."""
+        # Build a nested tree with a symlink pointing outside of it
+        target_dir = tempfile.mkdtemp()
+        target_file = os.path.join(target_dir, "keep.txt")
+        self.fs.create_file(target_file)
+        self.fs.create_file(os.path.join(self.test_dir, "a", "b", "file.txt"))
+        try:
+            os.symlink(target_dir, os.path.join(self.test_dir, "a", "link"), target_is_directory=True)
+        except (OSError, NotImplementedError):
+            self.skipTest("Symlinks are not available")
+        
+        # Remove the tree
+        CleanupManager._fast_rmtree(self.test_dir)
+        
+        # Verify the tree is gone and the link target survived
+        self.assertFalse(os.path.exists(self.test_dir))
+        self.assertTrue(os.path.exists(target_file))
+
+    @patch('windows_dev_toolkit.utils.cleanup.CleanupManager._fast_rmtree')
+    def test_run_cleanup_nested_directories(self, mock_rmtree):
+        """Test nested temp directories are removed with their parent."""
+        # Add the temp directory and a directory inside it
+        nested_dir = os.path.join(self.test_dir, "nested")
+        os.mkdir(nested_dir)
+        self.cleanup_manager.add_temp_dir(nested_dir)
+        self.cleanup_manager.add_temp_dir(self.test_dir)
+        
+        # Run cleanup
+        self.cleanup_manager.run()
+        
+        # Verify only the outer directory was removed
+        mock_rmtree.assert_called_once_with(self.test_dir)
+
+    @patch('windows_dev_toolkit.utils.cleanup.os.unlink')
+    def test_cleanup_file_exception(self, mock_unlink):
         """Test handling exceptions during file cleanup."""
         # Set up the mock to raise an exception
-        mock_remove.side_effect = Exception("Test exception")
+        mock_unlink.side_effect = Exception("Test exception")
         
         # Add a file that will trigger the exception
-        self.cleanup_manager.add_temp_file(self.test_file.name)
+        self.cleanup_manager.add_temp_file(self.test_file)
         
         # Run cleanup (should not raise an exception)
         self.cleanup_manager.run()
         
-        # Verify the remove method was called
-        mock_remove.assert_called_once_with(self.test_file.name)
+        # Verify the unlink method was called
+        mock_unlink.assert_called_once_with(self.test_file)
 
-    @patch('shutil.rmtree')
+    @patch('windows_dev_toolkit.utils.cleanup.CleanupManager._fast_rmtree')
     def test_cleanup_directory_exception(self, mock_rmtree):
         """Test handling exceptions during directory cleanup."""
         # Set up the mock to raise an exception
@@ -106,19 +210,33 @@ class TestCleanupManager(unittest.TestCase):
         self.cleanup_manager.run()
         
         # Verify the rmtree method was called
-        mock_rmtree.assert_called_once_with(self.test_dir, ignore_errors=True)
+        mock_rmtree.assert_called_once_with(self.test_dir)
+
+    @patch('windows_dev_toolkit.utils.cleanup.os._exit')
+    @patch('windows_dev_toolkit.utils.cleanup.logging.shutdown')
+    def test_fast_exit(self, mock_shutdown, mock_exit):
+        """Test fast exit cleans up before terminating the process."""
+        # Add the temp file
+        self.cleanup_manager.add_temp_file(self.test_file)
+        
+        # Exit with a custom code
+        self.cleanup_manager.fast_exit(2)
+        
+        # Verify cleanup ran, logging was flushed and the process exit was requested
+        self.assertFalse(os.path.exists(self.test_file))
+        mock_shutdown.assert_called_once_with()
+        mock_exit.assert_called_once_with(2)
 
+    @patch('windows_dev_toolkit.utils.cleanup.CleanupManager._restore_transacted', return_value=False)
     @patch('windows_dev_toolkit.utils.cleanup.winreg')
-    def test_registry_backup_restore(self, mock_winreg):
+    def test_registry_backup_restore(self, mock_winreg, mock_transacted):
         """Test registry backup and restore."""
         # Create a mock registry key
         mock_key = MagicMock()
         mock_winreg.CreateKey.return_value.__enter__.return_value = mock_key
         
-        # Create mock registry mapping
-        mock_winreg.HKEY_LOCAL_MACHINE = 1
-        mock_winreg.HKEY_CURRENT_USER = 2
-        mock_winreg.REG_DWORD = 3
+        # Hive constants are resolved when the module is imported
+        root_key = _ROOT_KEY_MAP["HKEY_LOCAL_MACHINE"]
         
         # Add a registry backup
         test_key = "HKEY_LOCAL_MACHINE\\SOFTWARE\\Test"
@@ -128,13 +246,13 @@ class TestCleanupManager(unittest.TestCase):
         self.cleanup_manager.add_registry_backup(test_key, test_data)
         
         # Verify the backup was added
-        self.assertIn(test_key, self.cleanup_manager.registry_backups)
+        self.assertIn((root_key, "SOFTWARE\\Test"), self.cleanup_manager.registry_backups)
         
         # Restore the backup
         self.cleanup_manager.restore_registry_backups()
         
         # Verify the CreateKey was called
-        mock_winreg.CreateKey.assert_called_once_with(1, "SOFTWARE\\Test")
+        mock_winreg.CreateKey.assert_called_once_with(root_key, "SOFTWARE\\Test")
         
         # Verify SetValueEx was called
         mock_winreg.SetValueEx.assert_called_once_with(
@@ -0,0 +1,125 @@
+"""
+Tests for the Developer Key Management module.
+"""
+import json
+import unittest
+from contextlib import nullcontext
+from unittest.mock import patch
+
+from windows_dev_toolkit.modules.developer_keys import DeveloperKeyManager
+
+_KEY = {"type": "windows_dev", "value": "ABCDE-12345-FGHIJ-67890-KLMNO", "description": "Test"}
+_OTHER_KEY = {"type": "visual_studio", "value": "VS-ABCD-1234-EFGH-5678-IJKL", "description": "Other"}
+
+
+class _FakeRegistry:
+    """Stand-in for the key store's registry values, kept in a plain dict."""
+
+    def __init__(self):
+        self.values = {}
+
+    def open_key(self, *args, **kwargs):
+        if not self.values:
+            raise FileNotFoundError("Registry key not found")
+        return nullcontext(self)
+
+    def create_key(self, *args, **kwargs):
+        return nullcontext(self)
+
+    def query_value(self, key, name):
+        if name not in self.values:
+            raise FileNotFoundError(name)
+        return self.values[name], 3
+
+    def set_value(self, key, name, reserved, value_type, value):
+        self.values[name] = value
+
+
+class TestDeveloperKeyManager(unittest.TestCase):
+    """Test cases for the encrypted developer key store."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        # Route the registry API to an in-memory store
+        self.registry = _FakeRegistry()
+        patchers = [
+            patch('winreg.OpenKey', self.registry.open_key),
+            patch('winreg.CreateKeyEx', self.registry.create_key),
+            patch('winreg.QueryValueEx', self.registry.query_value),
+            patch('winreg.SetValueEx', self.registry.set_value),
+            patch.object(DeveloperKeyManager, '_get_machine_id', return_value="test-machine"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _reload(self):
+        """Read the store back through a manager with no cached state."""
+        return DeveloperKeyManager({})._get_stored_keys()
+
+    def test_fresh_store_round_trip(self):
+        """Test keys saved to a new store can be read back."""
+        # Save a key to an empty registry
+        DeveloperKeyManager({})._save_keys([_KEY])
+
+        # Verify the salt and the store were both written
+        self.assertEqual(set(self.registry.values),
+                         {DeveloperKeyManager.REG_KEY_SALT_VALUE, DeveloperKeyManager.REG_KEY_STORE_VALUE})
+        self.assertEqual(self._reload(), [_KEY])
+
+    def test_legacy_store_is_rewrapped(self):
+        """Test a store without a data key is read, then rewritten in wrapped form."""
+        # Write a store encrypted directly with the password-derived key
+        manager = DeveloperKeyManager({})
+        salt = b"0123456789abcdef"
+        self.registry.values = {
+            DeveloperKeyManager.REG_KEY_SALT_VALUE: salt,
+            DeveloperKeyManager.REG_KEY_STORE_VALUE: manager._encrypt_data(json.dumps([_KEY]).encode(), salt),
+        }
+
+        # Read the legacy store and add a key to it
+        self.assertEqual(manager._get_stored_keys(), [_KEY])
+        manager._add_key_to_store(_OTHER_KEY)
+
+        # Verify the store now carries a wrapped data key under the same salt
+        stored_data = self.registry.values[DeveloperKeyManager.REG_KEY_STORE_VALUE]
+        self.assertIn(DeveloperKeyManager._STORE_SEPARATOR, stored_data)
+        self.assertEqual(self.registry.values[DeveloperKeyManager.REG_KEY_SALT_VALUE], salt)
+        self.assertEqual(self._reload(), [_KEY, _OTHER_KEY])
+
+    def test_deleted_store_is_recreated(self):
+        """Test a store deleted after it was read is recreated with its salt."""
+        # Save a key, then delete the store behind the manager's back
+        manager = DeveloperKeyManager({})
+        manager._save_keys([_KEY])
+        self.registry.values.clear()
+
+        # Read the missing store and save a new key
+        self.assertEqual(manager._get_stored_keys(), [])
+        manager._add_key_to_store(_OTHER_KEY)
+
+        # Verify the salt was persisted again and the new store reads back
+        self.assertIn(DeveloperKeyManager.REG_KEY_SALT_VALUE, self.registry.values)
+        self.assertEqual(self._reload(), [_OTHER_KEY])
+
+    def test_unreadable_store_is_not_overwritten(self):
+        """Test a store that fails to decrypt is left untouched."""
+        # Write a store, then read it through a manager with another password
+        DeveloperKeyManager({})._save_keys([_KEY])
+        stored_values = dict(self.registry.values)
+        manager = DeveloperKeyManager({})
+        manager.machine_id = "other-machine"
+
+        # Read the store, which fails to decrypt, then try to add a key
+        with self.assertLogs('dev_keys', level='ERROR'):
+            self.assertEqual(manager._get_stored_keys(), [])
+            with self.assertRaises(RuntimeError):
+                manager._add_key_to_store(_OTHER_KEY)
+
+        # Verify the original store was neither replaced nor forgotten
+        self.assertEqual(self.registry.values, stored_values)
+        self.assertEqual(self._reload(), [_KEY])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Tests for the feature detection utility module.
+"""
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from windows_dev_toolkit.utils.feature_detection import FeatureDetection, _DISM_ENCODING
+
+# Captured from `dism /online /get-features /format:list` on a German console,
+# cut down to a few features; the banner is in the OEM code page (cp850)
+_DISM_LISTING = (
+    b"\r\n"
+    b"Tool zur Imageverwaltung f\x81r die Bereitstellung\r\n"
+    b"Version: 10.0.19041.3636\r\n"
+    b"\r\n"
+    b"Abbildversion: 10.0.19045.4046\r\n"
+    b"\r\n"
+    b"Features listing for package : Microsoft-Windows-Foundation-Package~31bf3856ad364e35~amd64~~10.0.19041.1\r\n"
+    b"\r\n"
+    b"Feature Name : Printing-PrintToPDFServices-Features\r\n"
+    b"State : Enabled\r\n"
+    b"\r\n"
+    b"Feature Name : Microsoft-Windows-Subsystem-Linux \r\n"
+    b"State : Disabled\r\n"
+    b"\r\n"
+    b"Feature Name : VirtualMachinePlatform\r\n"
+    b"State : Enable Pending\r\n"
+    b"\r\n"
+    b"Der Vorgang wurde erfolgreich beendet.\r\n"
+)
+
+# Captured from `dism /online /get-featureinfo /featurename:Microsoft-Windows-Subsystem-Linux`
+_DISM_FEATURE_INFO = (
+    "\r\n"
+    "Version: 10.0.19041.3636\r\n"
+    "\r\n"
+    "Feature Name : Microsoft-Windows-Subsystem-Linux\r\n"
+    "Display Name : Windows-Subsystem f\u00fcr Linux\r\n"
+    "Restart Required : Possible\r\n"
+    "State : Disabled\r\n"
+    "\r\n"
+    "Custom Properties:\r\n"
+    "\r\n"
+    "(No custom properties found)\r\n"
+).encode(_DISM_ENCODING)
+
+
+class TestFeatureDetection(unittest.TestCase):
+    """Test cases for feature detection functionality."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        # Keep the detection cache out of the user's profile
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        patcher = patch.object(FeatureDetection, 'CACHE_DIR', cache_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.detector = FeatureDetection()
+
+    @patch('subprocess.run')
+    def test_detect_windows_features(self, mock_run):
+        """Test parsing DISM's feature listing."""
+        # Set up mock subprocess to return the captured listing
+        mock_run.return_value = SimpleNamespace(returncode=0, stdout=_DISM_LISTING, stderr=b"")
+
+        # Detect features, bypassing the cache
+        features = self.detector.detect_windows_features(force_refresh=True)
+
+        # Verify every feature was read and only Enabled counts as installed
+        self.assertEqual(features, {
+            'Printing-PrintToPDFServices-Features': {'installed': True},
+            'Microsoft-Windows-Subsystem-Linux': {'installed': False},
+            'VirtualMachinePlatform': {'installed': False},
+        })
+
+    @patch('subprocess.run')
+    def test_get_feature_details(self, mock_run):
+        """Test parsing DISM's record for a single feature."""
+        # Set up mock subprocess to return the captured record
+        mock_run.return_value = SimpleNamespace(returncode=0, stdout=_DISM_FEATURE_INFO, stderr=b"")
+
+        # Read the details twice
+        details = self.detector.get_feature_details('Microsoft-Windows-Subsystem-Linux')
+        self.detector.get_feature_details('Microsoft-Windows-Subsystem-Linux')
+
+        # Verify the fields were decoded, blank lines skipped and DISM run once
+        self.assertEqual(details['Display Name'], "Windows-Subsystem f\u00fcr Linux")
+        self.assertEqual(details['Restart Required'], "Possible")
+        self.assertEqual(details['State'], "Disabled")
+        self.assertEqual(details['Custom Properties'], "")
+        self.assertNotIn("", details)
+        mock_run.assert_called_once()
+
+    @patch.object(FeatureDetection, '_probe_visual_studio_dirs', return_value=[])
+    def test_detect_visual_studio_vswhere(self, mock_probe):
+        """Test Visual Studio detection with empty vswhere output and without vswhere."""
+        # vswhere runs but reports nothing
+        with patch('subprocess.run', return_value=SimpleNamespace(returncode=0, stdout=b"\r\n", stderr=b"")):
+            self.assertEqual(self.detector._detect_visual_studio_versions(), [])
+        mock_probe.assert_not_called()
+
+        # vswhere is not installed, so the install folders are probed instead
+        with patch('subprocess.run', side_effect=FileNotFoundError("vswhere.exe")):
+            self.assertEqual(self.detector._detect_visual_studio_versions(), [])
+        mock_probe.assert_called_once_with()
+
+    @patch.object(FeatureDetection, 'detect_office_installation', side_effect=OSError("Access denied"))
+    @patch.object(FeatureDetection, 'detect_installed_software', return_value={'git': {'installed': True}})
+    @patch.object(FeatureDetection, 'detect_windows_features', return_value={})
+    @patch.object(FeatureDetection, 'detect_system_configuration', return_value={'developer_mode': True})
+    def test_get_all_features_partial(self, *mocks):
+        """Test one failing detector still leaves the other results."""
+        # Run every detector while capturing error logs
+        with self.assertLogs('feature_detection', level='ERROR') as logs:
+            all_features = self.detector.get_all_features()
+
+        # Verify the failure was logged and reported as an empty result
+        self.assertEqual(logs.output, ["ERROR:feature_detection:Error detecting office: Access denied"])
+        self.assertEqual(all_features['office'], {})
+        self.assertEqual(all_features['system'], {'developer_mode': True})
+        self.assertEqual(all_features['software'], {'git': {'installed': True}})
+        self.assertIn('timestamp', all_features)
+
+
+if __name__ == '__main__':
+    unittest.main()
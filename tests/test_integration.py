@@ -2,49 +2,49 @@
 Integration tests for the Windows Developer Utilities Toolkit.
 """
 import unittest
-from unittest.mock import patch, MagicMock
-import sys
-import os
-import tempfile
-
-# Add local path to import modules
-sys.path.append('.')
+from unittest.mock import patch, Mock, MagicMock
 
 # Import main module to test
 from windows_dev_toolkit.main import DeveloperToolkit
+from windows_dev_toolkit.utils.ui import TUIManager
 
 
 class TestIntegration(unittest.TestCase):
     """Integration test cases for the Windows Developer Utilities Toolkit."""
 
-    @patch('windows_dev_toolkit.utils.admin_check.verify_admin_privileges')
-    def setUp(self, mock_admin_check):
-        """Set up test fixtures."""
-        # Mock admin check to return True
-        mock_admin_check.return_value = True
-        
-        # Create a temporary directory for test files
-        self.temp_dir = tempfile.mkdtemp()
-        
-        # Create toolkit instance
-        self.toolkit = DeveloperToolkit()
-        
-        # Mock TUI
-        self.toolkit.tui = MagicMock()
+    @classmethod
+    def setUpClass(cls):
+        """Set up fixtures shared by the whole test case."""
+        # Patch the name main.py calls, so run() sees the mocked result
+        cls._admin_patcher = patch('windows_dev_toolkit.main.verify_admin_privileges')
+        cls.mock_admin_check = cls._admin_patcher.start()
+        
+        # Build the toolkit once; tests get it back with fresh mocks in setUp
+        cls._shared_toolkit = DeveloperToolkit()
+        cls._shared_modules = dict(cls._shared_toolkit.modules)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Restore the admin check."""
+        cls._admin_patcher.stop()
 
-    def tearDown(self):
-        """Tear down test fixtures."""
-        # Clean up temporary directory
-        if os.path.exists(self.temp_dir):
-            import shutil
-            shutil.rmtree(self.temp_dir)
+    def setUp(self):
+        """Set up test fixtures."""
+        # Mock admin check to return True unless a test says otherwise
+        self.mock_admin_check.reset_mock()
+        self.mock_admin_check.return_value = True
+        
+        # Reuse the shared toolkit, replacing whatever the last test changed
+        self.toolkit = self._shared_toolkit
+        self.toolkit.modules = dict(self._shared_modules)
+        
+        # Mock TUI, logger and cleanup manager
+        self.toolkit.tui = Mock(spec=TUIManager)
+        self.toolkit.logger = MagicMock()
+        self.toolkit.cleanup = MagicMock()
 
-    @patch('windows_dev_toolkit.utils.admin_check.verify_admin_privileges')
-    def test_toolkit_init(self, mock_admin_check):
+    def test_toolkit_init(self):
         """Test toolkit initialization."""
-        # Mock admin check to return True
-        mock_admin_check.return_value = True
-        
         # Create toolkit instance
         toolkit = DeveloperToolkit()
         
@@ -65,19 +65,18 @@ class TestIntegration(unittest.TestCase):
         self.assertIn("office", toolkit.modules)
         self.assertIn("windows", toolkit.modules)
 
-    @patch('windows_dev_toolkit.utils.admin_check.verify_admin_privileges')
-    def test_toolkit_run_no_admin(self, mock_admin_check):
+    def test_toolkit_run_no_admin(self):
         """Test toolkit run without admin privileges."""
         # Mock admin check to return False
-        mock_admin_check.return_value = False
+        self.mock_admin_check.return_value = False
         
-        # Create toolkit instance with mocked components
-        toolkit = DeveloperToolkit()
-        toolkit.tui = MagicMock()
+        # Use the shared toolkit, whose components setUp already mocked
+        toolkit = self.toolkit
         
-        # Run the toolkit with mocked sys.exit
-        with patch('sys.exit') as mock_exit:
-            toolkit.run()
+        # Run the toolkit with mocked sys.exit, which still stops the run
+        with patch('sys.exit', side_effect=SystemExit(1)) as mock_exit:
+            with self.assertRaises(SystemExit):
+                toolkit.run()
             
             # Verify error message was displayed
             toolkit.tui.display_error.assert_called_once()
@@ -85,15 +84,10 @@ class TestIntegration(unittest.TestCase):
             # Verify sys.exit was called
             mock_exit.assert_called_once_with(1)
 
-    @patch('windows_dev_toolkit.utils.admin_check.verify_admin_privileges')
-    def test_toolkit_run_with_admin(self, mock_admin_check):
+    def test_toolkit_run_with_admin(self):
         """Test toolkit run with admin privileges."""
-        # Mock admin check to return True
-        mock_admin_check.return_value = True
-        
-        # Create toolkit instance with mocked components
-        toolkit = DeveloperToolkit()
-        toolkit.tui = MagicMock()
+        # Use the shared toolkit, whose components setUp already mocked
+        toolkit = self.toolkit
         
         # Setup menu navigation: show welcome -> select exit
         toolkit.tui.display_main_menu.return_value = "exit"
@@ -110,15 +104,10 @@ class TestIntegration(unittest.TestCase):
         # Verify goodbye was displayed
         toolkit.tui.display_goodbye.assert_called_once()
 
-    @patch('windows_dev_toolkit.utils.admin_check.verify_admin_privileges')
-    def test_toolkit_module_selection(self, mock_admin_check):
+    def test_toolkit_module_selection(self):
         """Test toolkit module selection and execution."""
-        # Mock admin check to return True
-        mock_admin_check.return_value = True
-        
-        # Create toolkit instance with mocked components
-        toolkit = DeveloperToolkit()
-        toolkit.tui = MagicMock()
+        # Use the shared toolkit, whose components setUp already mocked
+        toolkit = self.toolkit
         
         # Mock modules
         toolkit.modules = {
@@ -143,16 +132,10 @@ class TestIntegration(unittest.TestCase):
         toolkit.modules["office"].execute.assert_not_called()
         toolkit.modules["windows"].execute.assert_not_called()
 
-    @patch('windows_dev_toolkit.utils.admin_check.verify_admin_privileges')
-    def test_toolkit_exception_handling(self, mock_admin_check):
+    def test_toolkit_exception_handling(self):
         """Test toolkit exception handling."""
-        # Mock admin check to return True
-        mock_admin_check.return_value = True
-        
-        # Create toolkit instance with mocked components
-        toolkit = DeveloperToolkit()
-        toolkit.tui = MagicMock()
-        toolkit.logger = MagicMock()
+        # Use the shared toolkit, whose components setUp already mocked
+        toolkit = self.toolkit
         
         # Setup main menu to raise an exception
         test_exception = Exception("Test exception")
@@ -173,16 +156,10 @@ class TestIntegration(unittest.TestCase):
         # Verify goodbye was displayed (cleanup still runs)
         toolkit.tui.display_goodbye.assert_called_once()
 
-    @patch('windows_dev_toolkit.utils.admin_check.verify_admin_privileges')
-    def test_toolkit_cleanup(self, mock_admin_check):
+    def test_toolkit_cleanup(self):
         """Test toolkit cleanup on exit."""
-        # Mock admin check to return True
-        mock_admin_check.return_value = True
-        
-        # Create toolkit instance with mocked components
-        toolkit = DeveloperToolkit()
-        toolkit.tui = MagicMock()
-        toolkit.cleanup = MagicMock()
+        # Use the shared toolkit, whose components setUp already mocked
+        toolkit = self.toolkit
         
         # Setup menu navigation: show welcome -> select exit
         toolkit.tui.display_main_menu.return_value = "exit"
@@ -3,14 +3,13 @@ Tests for the TUI (Text User Interface) manager module.
 """
 import unittest
 from unittest.mock import patch, MagicMock
-import sys
 import io
 
-# Add local path to import modules
-sys.path.append('.')
-
 from windows_dev_toolkit.utils.ui import TUIManager
 
+# Options shared by the choice prompt tests
+_OPTIONS = ["Option 1", "Option 2", "Option 3", "Option 4"]
+
 
 class TestTUIManager(unittest.TestCase):
     """Test cases for TUI manager functionality."""
@@ -19,25 +18,23 @@ class TestTUIManager(unittest.TestCase):
         """Set up test fixtures."""
         self.tui = TUIManager()
         
-        # Patch stdout to capture output
-        self.stdout_patcher = patch('sys.stdout', new_callable=io.StringIO)
-        self.mock_stdout = self.stdout_patcher.start()
-
-    def tearDown(self):
-        """Tear down test fixtures."""
-        self.stdout_patcher.stop()
+        # Patch stdout to capture output; started per test so it sits inside
+        # any capture the test runner installs around each test
+        stdout_patcher = patch('sys.stdout', new_callable=io.StringIO)
+        self.mock_stdout = stdout_patcher.start()
+        self.addCleanup(stdout_patcher.stop)
 
-    @patch('os.system')
-    def test_clear_screen(self, mock_system):
+    def test_clear_screen(self):
         """Test clear screen functionality."""
-        # Call the clear screen method
-        self.tui._clear_screen()
+        # Record any shell command instead of running it
+        commands = []
+        with patch('os.system', new=commands.append):
+            # Call the clear screen method
+            self.tui._clear_screen()
         
-        # Verify os.system was called with the correct command
-        if sys.platform == 'win32':
-            mock_system.assert_called_once_with('cls')
-        else:
-            mock_system.assert_called_once_with('clear')
+        # Verify the screen was cleared with escape codes, not a shell command
+        self.assertEqual(self.mock_stdout.getvalue(), TUIManager.CLEAR_SCREEN)
+        self.assertEqual(commands, [])
 
     def test_print_header(self):
         """Test header printing."""
@@ -53,124 +50,142 @@ class TestTUIManager(unittest.TestCase):
         # Verify there are separator lines
         self.assertIn("=", output)
 
-    def test_display_info(self):
-        """Test displaying info messages."""
-        # Display an info message
-        self.tui.display_info("Test info message")
+    def test_display_goodbye_centered(self):
+        """Test goodbye lines are centered by their visible width."""
+        # Display the goodbye screen
+        self.tui.display_goodbye()
         
-        # Get the output
+        # Find the closing line in the output
         output = self.mock_stdout.getvalue()
-        
-        # Verify the message is in the output
-        self.assertIn("Test info message", output)
-        
-        # Verify the INFO prefix is present
-        self.assertIn("[INFO]", output)
-
-    def test_display_error(self):
-        """Test displaying error messages."""
-        # Display an error message
-        self.tui.display_error("Test error message")
+        line = next(row for row in output.splitlines() if "Have a productive day!" in row)
+        
+        # Verify the color codes did not count towards the padding
+        padding = len(line) - len(line.lstrip(' '))
+        self.assertEqual(padding, (self.tui.width - len("Have a productive day!")) // 2)
+
+    def test_display_goodbye_wrapped_stdout(self):
+        """Test a replaced stdout that exposes a byte buffer still gets text."""
+        # Replace stdout with a wrapper that proxies its inner buffer
+        stream = MagicMock(spec=['write', 'flush', 'buffer'])
+        
+        # Display the goodbye screen through the wrapper
+        with patch('sys.stdout', stream):
+            self.tui.display_goodbye()
+        
+        # Verify the screen went through the wrapper, not around it
+        stream.buffer.write.assert_not_called()
+        written = "".join(c.args[0] for c in stream.write.call_args_list)
+        self.assertIn("Have a productive day!", written)
+
+    def test_display_messages(self):
+        """Test displaying info, error, success and warning messages."""
+        # Each display method with the prefix it prints
+        cases = [
+            ("display_info", "[INFO]"),
+            ("display_error", "[ERROR]"),
+            ("display_success", "[SUCCESS]"),
+            ("display_warning", "[WARNING]"),
+        ]
+        for method, prefix in cases:
+            with self.subTest(method=method):
+                # Empty the capture buffer left by the previous method
+                self.mock_stdout.seek(0)
+                self.mock_stdout.truncate()
+                
+                # Display a message
+                getattr(self.tui, method)("Test message")
+                
+                # Get the output
+                output = self.mock_stdout.getvalue()
+                
+                # Verify the message and prefix are in the output
+                self.assertIn("Test message", output)
+                self.assertIn(prefix, output)
+
+    def test_update_progress(self):
+        """Test progress bar rendering."""
+        # Draw a half-finished bar
+        self.tui.update_progress(50)
         
         # Get the output
         output = self.mock_stdout.getvalue()
         
-        # Verify the message is in the output
-        self.assertIn("Test error message", output)
+        # Verify half of the cells are filled and the percentage is shown
+        self.assertIn("|" + "█" * 25 + "░" * 25 + "|", output)
+        self.assertIn("50.0%", output)
         
-        # Verify the ERROR prefix is present
-        self.assertIn("[ERROR]", output)
-
-    def test_display_success(self):
-        """Test displaying success messages."""
-        # Display a success message
-        self.tui.display_success("Test success message")
+        # Verify the line is left open for the next update
+        self.assertFalse(output.endswith("\n"))
         
-        # Get the output
+        # Complete the bar
+        self.tui.update_progress(100)
         output = self.mock_stdout.getvalue()
         
-        # Verify the message is in the output
-        self.assertIn("Test success message", output)
-        
-        # Verify the SUCCESS prefix is present
-        self.assertIn("[SUCCESS]", output)
-
-    def test_display_warning(self):
-        """Test displaying warning messages."""
-        # Display a warning message
-        self.tui.display_warning("Test warning message")
-        
-        # Get the output
-        output = self.mock_stdout.getvalue()
-        
-        # Verify the message is in the output
-        self.assertIn("Test warning message", output)
-        
-        # Verify the WARNING prefix is present
-        self.assertIn("[WARNING]", output)
-
-    @patch('builtins.input', return_value='y')
-    def test_confirm_yes(self, mock_input):
-        """Test confirmation dialog with 'yes' response."""
-        # Call confirm method
-        result = self.tui.confirm("Test confirmation?")
-        
-        # Verify input was called with the right message
-        mock_input.assert_called_once()
-        self.assertIn("Test confirmation?", mock_input.call_args[0][0])
-        
-        # Verify result is True (yes)
-        self.assertTrue(result)
-
-    @patch('builtins.input', return_value='n')
-    def test_confirm_no(self, mock_input):
-        """Test confirmation dialog with 'no' response."""
-        # Call confirm method
-        result = self.tui.confirm("Test confirmation?")
-        
-        # Verify input was called with the right message
-        mock_input.assert_called_once()
-        self.assertIn("Test confirmation?", mock_input.call_args[0][0])
-        
-        # Verify result is False (no)
-        self.assertFalse(result)
-
-    @patch('builtins.input', return_value='test input')
+        # Verify every cell is filled and the line is ended
+        self.assertIn("|" + "█" * 50 + "|", output)
+        self.assertTrue(output.endswith("\n"))
+
+    def test_update_progress_unchanged(self):
+        """Test repeated progress updates are only drawn once."""
+        # Report the same progress twice
+        self.tui.update_progress(20)
+        self.tui.update_progress(20)
+        
+        # Verify only one frame was written
+        self.assertEqual(self.mock_stdout.getvalue().count("Progress:"), 1)
+
+    @patch('builtins.input')
+    def test_confirm(self, mock_input):
+        """Test confirmation dialog with yes and no responses."""
+        # Each response with the answer it should give
+        cases = [("y", True), ("n", False), ("yes", True), ("no", False)]
+        for response, expected in cases:
+            with self.subTest(response=response):
+                # Answer the prompt, forgetting the previous call
+                mock_input.reset_mock()
+                mock_input.return_value = response
+                
+                # Call confirm method
+                result = self.tui.confirm("Test confirmation?")
+                
+                # Verify input was called with the right message
+                mock_input.assert_called_once()
+                self.assertIn("Test confirmation?", mock_input.call_args[0][0])
+                
+                # Verify the response was read correctly
+                self.assertIs(result, expected)
+
+    @patch('builtins.input')
     def test_prompt_input(self, mock_input):
-        """Test input prompt."""
-        # Call prompt_input method
-        result = self.tui.prompt_input("Enter test:")
-        
-        # Verify input was called with the right message
-        mock_input.assert_called_once()
-        self.assertIn("Enter test:", mock_input.call_args[0][0])
-        
-        # Verify result matches the input
-        self.assertEqual(result, "test input")
-
-    @patch('builtins.input', return_value='')
-    def test_prompt_input_default(self, mock_input):
-        """Test input prompt with default value."""
-        # Call prompt_input method with a default
-        result = self.tui.prompt_input("Enter test:", default="default value")
-        
-        # Verify input was called with the right message including default
-        mock_input.assert_called_once()
-        input_prompt = mock_input.call_args[0][0]
-        self.assertIn("Enter test:", input_prompt)
-        self.assertIn("default value", input_prompt)
-        
-        # Verify result matches the default
-        self.assertEqual(result, "default value")
-
-    @patch('builtins.input', side_effect=['2'])
+        """Test input prompt with and without a default value."""
+        # Each default with the typed input and the expected result
+        cases = [
+            ("", "test input", "test input"),
+            ("default value", "", "default value"),
+        ]
+        for default, response, expected in cases:
+            with self.subTest(default=default):
+                # Answer the prompt, forgetting the previous call
+                mock_input.reset_mock()
+                mock_input.return_value = response
+                
+                # Call prompt_input method
+                result = self.tui.prompt_input("Enter test:", default=default)
+                
+                # Verify input was called with the right message including any default
+                mock_input.assert_called_once()
+                input_prompt = mock_input.call_args[0][0]
+                self.assertIn("Enter test:", input_prompt)
+                self.assertIn(default, input_prompt)
+                
+                # Verify result matches the input or the default
+                self.assertEqual(result, expected)
+
+    @patch('builtins.input', return_value='2')
     def test_prompt_choice(self, mock_input):
         """Test choice prompt."""
-        # Define options
-        options = ["Option 1", "Option 2", "Option 3"]
-        
         # Call prompt_choice method
-        result = self.tui.prompt_choice("Select option:", options)
+        result = self.tui.prompt_choice("Select option:", _OPTIONS[:3])
         
         # Verify input was called
         mock_input.assert_called_once()
@@ -181,11 +196,8 @@ class TestTUIManager(unittest.TestCase):
     @patch('builtins.input', side_effect=['invalid', '4', '2'])
     def test_prompt_choice_validation(self, mock_input):
         """Test choice prompt with validation."""
-        # Define options
-        options = ["Option 1", "Option 2", "Option 3"]
-        
         # Call prompt_choice method
-        result = self.tui.prompt_choice("Select option:", options)
+        result = self.tui.prompt_choice("Select option:", _OPTIONS[:3])
         
         # Verify input was called multiple times due to validation
         self.assertEqual(mock_input.call_count, 3)
@@ -193,35 +205,25 @@ class TestTUIManager(unittest.TestCase):
         # Verify result matches the expected index (2-1=1)
         self.assertEqual(result, 1)
 
-    @patch('builtins.input', side_effect=['1,3'])
+    @patch('builtins.input')
     def test_prompt_multichoice(self, mock_input):
-        """Test multi-choice prompt."""
-        # Define options
-        options = ["Option 1", "Option 2", "Option 3", "Option 4"]
-        
-        # Call prompt_multichoice method
-        result = self.tui.prompt_multichoice("Select options:", options)
-        
-        # Verify input was called
-        mock_input.assert_called_once()
-        
-        # Verify result matches the expected indices (1-1=0, 3-1=2)
-        self.assertEqual(result, [0, 2])
-
-    @patch('builtins.input', side_effect=[''])
-    def test_prompt_multichoice_empty(self, mock_input):
-        """Test multi-choice prompt with empty input."""
-        # Define options
-        options = ["Option 1", "Option 2", "Option 3"]
-        
-        # Call prompt_multichoice method
-        result = self.tui.prompt_multichoice("Select options:", options)
-        
-        # Verify input was called
-        mock_input.assert_called_once()
-        
-        # Verify result is an empty list
-        self.assertEqual(result, [])
+        """Test multi-choice prompt with a selection and with empty input."""
+        # Each response with the expected indices (1-1=0, 3-1=2)
+        cases = [("1,3", [0, 2]), ("", [])]
+        for response, expected in cases:
+            with self.subTest(response=response):
+                # Answer the prompt, forgetting the previous call
+                mock_input.reset_mock()
+                mock_input.return_value = response
+                
+                # Call prompt_multichoice method
+                result = self.tui.prompt_multichoice("Select options:", _OPTIONS)
+                
+                # Verify input was called
+                mock_input.assert_called_once()
+                
+                # Verify result matches the expected indices
+                self.assertEqual(result, expected)
 
 
 if __name__ == '__main__':
@@ -2,44 +2,73 @@
 Tests for the Windows Configuration Manager module.
 """
 import unittest
-from unittest.mock import patch, MagicMock, call
-import sys
+from unittest.mock import patch, Mock, MagicMock, call
 import os
 import winreg
-
-# Add local path to import modules
-sys.path.append('.')
+from types import SimpleNamespace
 
 from windows_dev_toolkit.modules.windows_config import WindowsConfigManager
+from windows_dev_toolkit.utils.ui import TUIManager
+from tests.conftest import assert_ui
+
+# Registry keys the manager is expected to write to
+_APPMODEL_KEY = r"SOFTWARE\Microsoft\Windows\CurrentVersion\AppModelUnlock"
+_PRIORITY_KEY = r"SYSTEM\CurrentControlSet\Control\PriorityControl"
+
+
+class _FakeRun:
+    """Stand-in for subprocess.run that only keeps the commands it was given."""
+
+    def __init__(self, returncode=0):
+        self.returncode = returncode
+        self.commands = []
+        self.envs = []
+
+    def __call__(self, command, *args, **kwargs):
+        self.commands.append(command)
+        self.envs.append(kwargs.get("env"))
+        return SimpleNamespace(returncode=self.returncode, stdout="")
 
 
 class TestWindowsConfigManager(unittest.TestCase):
     """Test cases for Windows Configuration Manager functionality."""
 
-    def setUp(self):
-        """Set up test fixtures."""
+    @classmethod
+    def setUpClass(cls):
+        """Set up fixtures shared by the whole test case."""
+        # Every registry test goes through CreateKeyEx and SetValueEx
+        cls._registry_patchers = [patch('winreg.CreateKeyEx'), patch('winreg.SetValueEx')]
+        cls.mock_create_key, cls.mock_set_value = [p.start() for p in cls._registry_patchers]
+        
         # Create a mock config
-        self.config = {
+        cls.config = {
             "windows": {
                 "features": ["Microsoft-Windows-Subsystem-Linux", "VirtualMachinePlatform"],
                 "dev_mode": True
             }
         }
         
-        # Create the manager instance
-        self.windows_manager = WindowsConfigManager(self.config)
+        # Create the manager instance; it keeps no state between calls
+        cls.windows_manager = WindowsConfigManager(cls.config)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Restore the registry API."""
+        for patcher in cls._registry_patchers:
+            patcher.stop()
+
+    def setUp(self):
+        """Set up test fixtures."""
+        # Create a mock UI limited to the TUIManager interface
+        self.mock_ui = Mock(spec=TUIManager)
         
-        # Create a mock UI
-        self.mock_ui = MagicMock()
+        # Forget registry calls made by earlier tests
+        self.mock_create_key.reset_mock()
+        self.mock_set_value.reset_mock()
+        self.mock_key = self.mock_create_key.return_value.__enter__.return_value
 
-    @patch('winreg.CreateKey')
-    @patch('winreg.SetValueEx')
-    def test_enable_developer_mode(self, mock_set_value, mock_create_key):
+    def test_enable_developer_mode(self):
         """Test enabling Windows Developer Mode."""
-        # Set up mocks
-        mock_key = MagicMock()
-        mock_create_key.return_value.__enter__.return_value = mock_key
-        
         # Set up UI for confirmation
         self.mock_ui.confirm.return_value = True
         
@@ -50,20 +79,21 @@ class TestWindowsConfigManager(unittest.TestCase):
         self.mock_ui.confirm.assert_called_once()
         
         # Verify registry key was created
-        mock_create_key.assert_called_once_with(
+        self.mock_create_key.assert_called_once_with(
             winreg.HKEY_LOCAL_MACHINE,
-            r"SOFTWARE\Microsoft\Windows\CurrentVersion\AppModelUnlock"
+            _APPMODEL_KEY,
+            0,
+            winreg.KEY_SET_VALUE | winreg.KEY_WOW64_64KEY
         )
         
         # Verify registry values were set
-        mock_set_value.assert_has_calls([
-            call(mock_key, "AllowDevelopmentWithoutDevLicense", 0, winreg.REG_DWORD, 1),
-            call(mock_key, "AllowAllTrustedApps", 0, winreg.REG_DWORD, 1)
+        self.mock_set_value.assert_has_calls([
+            call(self.mock_key, "AllowDevelopmentWithoutDevLicense", 0, winreg.REG_DWORD, 1),
+            call(self.mock_key, "AllowAllTrustedApps", 0, winreg.REG_DWORD, 1)
         ])
         
         # Verify UI methods were called
-        self.mock_ui.display_info.assert_called()
-        self.mock_ui.display_success.assert_called_once()
+        assert_ui(self.mock_ui, display_info=2, display_success=1)
 
     @patch('subprocess.run')
     def test_configure_windows_features(self, mock_run):
@@ -84,58 +114,70 @@ class TestWindowsConfigManager(unittest.TestCase):
         # Verify confirmation was asked
         self.mock_ui.confirm.assert_called_once()
         
-        # Verify subprocess.run was called for each feature
-        self.assertEqual(mock_run.call_count, 2)
+        # Verify both features were installed with a single DISM call
+        mock_run.assert_called_once()
+        cmd = mock_run.call_args[0][0]
+        self.assertIn("/featurename:Microsoft-Windows-Subsystem-Linux", cmd)
+        self.assertIn("/featurename:NetFx3", cmd)
         
         # Verify UI methods were called
-        self.mock_ui.display_info.assert_called()
-        self.mock_ui.display_success.assert_called()
+        assert_ui(self.mock_ui, display_info=6, display_success=2)
 
-    @patch('winreg.CreateKey')
-    @patch('winreg.SetValueEx')
-    def test_set_performance_programs(self, mock_set_value, mock_create_key):
-        """Test setting system for best performance of programs."""
-        # Set up mocks
-        mock_key = MagicMock()
-        mock_create_key.return_value.__enter__.return_value = mock_key
+    @patch('subprocess.run')
+    def test_configure_windows_features_failure(self, mock_run):
+        """Test a failed DISM run logs the output it wrote to stdout."""
+        # Set up mock subprocess to fail the way DISM does
+        mock_run.return_value.returncode = 87
+        mock_run.return_value.stdout = "Error: 87\nThe enable-feature option is unknown."
+        mock_run.return_value.stderr = ""
+        
+        # Set up UI for feature selection and confirmation
+        self.mock_ui.prompt_multichoice.return_value = [0]
+        self.mock_ui.confirm.return_value = True
+        
+        # Call the configure Windows features method
+        with self.assertLogs("windows_config", level="ERROR") as logs:
+            self.windows_manager._configure_windows_features(self.mock_ui)
         
+        # Verify DISM's stdout was logged and shown
+        self.assertIn("The enable-feature option is unknown.", logs.output[0])
+        self.assertIn("The enable-feature option is unknown.", self.mock_ui.display_error.call_args[0][0])
+        self.mock_ui.display_success.assert_not_called()
+
+    def test_set_performance_programs(self):
+        """Test setting system for best performance of programs."""
         # Call the performance settings method
         self.windows_manager._set_performance_programs(self.mock_ui)
         
         # Verify registry key was created
-        mock_create_key.assert_called_once_with(
+        self.mock_create_key.assert_called_once_with(
             winreg.HKEY_LOCAL_MACHINE,
-            r"SYSTEM\CurrentControlSet\Control\PriorityControl"
+            _PRIORITY_KEY,
+            0,
+            winreg.KEY_SET_VALUE | winreg.KEY_WOW64_64KEY
         )
         
         # Verify registry value was set
-        mock_set_value.assert_called_once_with(
-            mock_key, "Win32PrioritySeparation", 0, winreg.REG_DWORD, 2
+        self.mock_set_value.assert_called_once_with(
+            self.mock_key, "Win32PrioritySeparation", 0, winreg.REG_DWORD, 2
         )
         
         # Verify UI method was called
         self.mock_ui.display_success.assert_called_once()
 
-    @patch('winreg.CreateKey')
-    @patch('winreg.SetValueEx')
-    def test_disable_visual_effects(self, mock_set_value, mock_create_key):
+    def test_disable_visual_effects(self):
         """Test disabling visual effects for performance."""
-        # Set up mocks
-        mock_key = MagicMock()
-        mock_create_key.return_value.__enter__.return_value = mock_key
-        
         # Call the visual effects method
         self.windows_manager._disable_visual_effects(self.mock_ui)
         
         # Verify registry keys were created (2 different keys)
-        self.assertEqual(mock_create_key.call_count, 2)
+        self.assertEqual(self.mock_create_key.call_count, 2)
         
         # Verify registry values were set
-        self.assertEqual(mock_set_value.call_count, 2)
+        self.assertEqual(self.mock_set_value.call_count, 2)
         
         # Verify UI methods were called
-        self.mock_ui.display_success.assert_called_once()
-        self.mock_ui.display_info.assert_called_once()
+        assert_ui(self.mock_ui, display_success=1, display_info=1)
 
     @patch('subprocess.run')
     def test_set_power_high_performance(self, mock_run):
@@ -172,33 +214,37 @@ class TestWindowsConfigManager(unittest.TestCase):
         # Verify UI method was called
         self.mock_ui.display_success.assert_called_once()
 
-    @patch('subprocess.run')
-    def test_configure_defender(self, mock_run):
+    def test_configure_defender(self):
         """Test configuring Windows Defender exceptions."""
-        # Set up mock subprocess
-        mock_run.return_value.returncode = 0
+        # Set up a successful subprocess stub
+        fake_run = _FakeRun()
         
         # Set up UI for folder input and confirmation
-        self.mock_ui.prompt_input.side_effect = ["C:\\Dev\\Folder1", "C:\\Dev\\Folder2", ""]
+        self.mock_ui.prompt_input.side_effect = ["C:\\Dev\\Folder1", "C:\\Dev\\Bob\u2019s Folder", "C:\\Dev\\Folder1", ""]
         self.mock_ui.confirm.return_value = True
         
-        # Mock path existence checks
-        with patch('os.path.exists', return_value=True):
+        # Stub the PowerShell call and path existence checks
+        with patch('subprocess.run', new=fake_run), patch('os.path.isdir', new=lambda path: True):
             # Call the configure defender method
             self.windows_manager._configure_defender(self.mock_ui)
         
         # Verify folder input was prompted multiple times
-        self.assertEqual(self.mock_ui.prompt_input.call_count, 3)
+        self.assertEqual(self.mock_ui.prompt_input.call_count, 4)
         
         # Verify confirmation was asked
         self.mock_ui.confirm.assert_called_once()
         
-        # Verify subprocess.run was called for each folder
-        self.assertEqual(mock_run.call_count, 2)
+        # Verify both folders were added once, with a single PowerShell call that
+        # reads them from the environment instead of its command text
+        self.assertEqual(len(fake_run.commands), 1)
+        command = fake_run.commands[0][-1]
+        folder1 = os.path.abspath("C:\\Dev\\Folder1")
+        folder2 = os.path.abspath("C:\\Dev\\Bob\u2019s Folder")
+        self.assertEqual(command, "Add-MpPreference -ExclusionPath $env:DEVTOOLKIT_EXCLUSION_PATHS.Split([char]10)")
+        self.assertEqual(fake_run.envs[0]["DEVTOOLKIT_EXCLUSION_PATHS"], f"{folder1}\n{folder2}")
         
         # Verify UI methods were called
-        self.mock_ui.display_info.assert_called()
-        self.mock_ui.display_success.assert_called()
+        assert_ui(self.mock_ui, display_info=4, display_success=3)
 
 
 if __name__ == '__main__':